@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+HTI Collector Benchmarks
+Runs every collector and the email digest offline against the recorded HTTP
+responses in collectors/fixtures/ (Grants.gov, Firecrawl, RSS, Reddit, Resend)
+at scaled input sizes, timing each stage the collectors mark (fetch, build,
+score, write, store; load, render, send for the digest).
+
+    python collectors/benchmark.py                              # 1x, 10x, 100x -> benchmark-results.json
+    python collectors/benchmark.py --scales 1,10 --repeat 5 --output baseline.json
+    python collectors/benchmark.py --compare baseline.json      # run, then diff against a baseline
+    python collectors/benchmark.py --diff baseline.json new.json
+
+At scale N every source returns N times as many entries (Grants.gov hits,
+Reddit posts) or N times as many sources are watched (foundations, partner
+feeds, competitor pages); copies get reworded titles so near-duplicate
+collapsing does not undo the scaling. Each run starts in a fresh temporary
+working directory, so no cache, report or state file carries over.
+
+Startup is measured too (kind 'startup', skip with --no-startup), each sample in
+a fresh interpreter. 'total' is the wall time of `run_all.py --check`,
+'python' is a bare interpreter, and every other stage is the import time of
+one entry-point module.
+"""
+import os
+
+# Fixture credentials, set before the collectors read them; any request without a fixture fails
+BENCH_ENV = {
+    'FIRECRAWL_API_KEY': 'fixture',
+    'FIRECRAWL_RATE_PER_MINUTE': '1000000',
+    'FIRECRAWL_CREDITS_PER_RUN': '1000000',
+    'REDDIT_CLIENT_ID': 'fixture',
+    'REDDIT_CLIENT_SECRET': 'fixture',
+    'REDDIT_SEARCH_LIMIT': '1000000',
+    'RESEND_API_KEY': 'fixture',
+    'HTI_STATE_DIR': '.hti-state'
+}
+os.environ.update(BENCH_ENV)
+
+import argparse
+import contextlib
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+import sentiment
+import run_all
+import grant_tracker
+import partner_monitor
+import competitive_scraper
+import reddit_digital_divide
+import send_email_digest
+from http_session import get_session
+from metrics import reset_metrics, stage_timings
+from records import reset_run_clock
+
+COLLECTORS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(COLLECTORS_DIR, 'fixtures')
+STARTUP_MODULES = ('run_all', 'grant_tracker', 'reddit_digital_divide', 'partner_monitor',
+                   'competitive_scraper', 'send_email_digest')
+DEFAULT_SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 3
+DEFAULT_OUTPUT = 'benchmark-results.json'
+REGRESSION_THRESHOLD = 1.25
+NOISE_FLOOR = 0.002  # seconds; smaller differences are never reported as regressions
+REWORD_FRACTION = 0.6
+
+WORD = re.compile(r"[A-Za-z][A-Za-z'-]+")
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+def _vocabulary():
+    """Words of every recorded title and body, used to reword scaled copies"""
+    words = set()
+    for name in ('grants_gov_search.json', 'reddit_search.json', 'philanthropy_news.rss', 'google_news.rss'):
+        words.update(w.lower() for w in WORD.findall(load_fixture(name).decode('utf-8')))
+    return sorted(words)
+
+VOCABULARY = _vocabulary()
+
+def reword(text, seed):
+    """Deterministic variant of `text` with most words swapped for fixture vocabulary"""
+    rng = random.Random(seed)
+    return re.sub(
+        WORD, lambda m: rng.choice(VOCABULARY) if rng.random() < REWORD_FRACTION else m.group(0), text
+    )
+
+class FixtureAdapter(BaseAdapter):
+    """requests transport that answers from recorded fixtures, scaled to `scale` copies"""
+
+    def __init__(self, scale=1):
+        super().__init__()
+        self.scale = scale
+        self.calls = 0
+        self.batches = []
+        self.routes = [
+            ('www.grants.gov', '/grantsws/rest/opportunities/search', self.grants_gov),
+            ('api.firecrawl.dev', '/v1/scrape', self.firecrawl),
+            ('api.firecrawl.dev', '/v1/batch/scrape/', self.firecrawl_batch_status),
+            ('api.firecrawl.dev', '/v1/batch/scrape', self.firecrawl_batch),
+            ('philanthropynewsdigest.org', '/news.rss', self.rss('philanthropy_news.rss')),
+            ('news.google.com', '/rss/search', self.rss('google_news.rss')),
+            ('www.reddit.com', '/api/v1/access_token', self.static('reddit_token.json')),
+            ('oauth.reddit.com', '/r/', self.reddit_search),
+            ('api.resend.com', '/emails', self.static('resend_email.json'))
+        ]
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        for host, path, handler in self.routes:
+            if url.netloc == host and url.path.startswith(path):
+                self.calls += 1
+                content_type, body = handler(url, request)
+                return self._response(request, content_type, body)
+        raise requests.ConnectionError(f'No fixture for {request.method} {request.url}')
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _response(request, content_type, body):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict({'Content-Type': content_type, 'Content-Length': str(len(body))})
+        response._content = body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def static(self, name):
+        body = load_fixture(name)
+        return lambda url, request: ('application/json', body)
+
+    def grants_gov(self, url, request):
+        recorded = json.loads(load_fixture('grants_gov_search.json'))
+        hits = []
+        for copy in range(self.scale):
+            for opp in recorded['oppHits']:
+                if copy:
+                    opp = dict(opp, id=f"{opp['id']}{copy:03d}", title=reword(opp['title'], f"{opp['id']}:{copy}"))
+                hits.append(opp)
+        # Paged like the real API: startRecordNum / rows over hitCount results
+        query = parse_qs(url.query)
+        start = int(query.get('startRecordNum', ['0'])[0])
+        rows = int(query.get('rows', [str(len(hits))])[0])
+        recorded.update(hitCount=len(hits), startRecord=start, oppHits=hits[start:start + rows])
+        return 'application/json', json.dumps(recorded).encode('utf-8')
+
+    def firecrawl(self, url, request):
+        """Recorded page; schema-extraction requests also get the recorded extraction"""
+        if 'extract' not in json.loads(request.body).get('formats', []):
+            return 'application/json', load_fixture('firecrawl_scrape.json')
+        scrape = json.loads(load_fixture('firecrawl_scrape.json'))
+        scrape['data'].update(json.loads(load_fixture('firecrawl_extract.json'))['data'])
+        return 'application/json', json.dumps(scrape).encode('utf-8')
+
+    def firecrawl_batch(self, url, request):
+        """Batch job submission; the job id carries the URLs so the status poll can answer for them"""
+        urls = json.loads(request.body)['urls']
+        self.batches.append(urls)
+        return 'application/json', json.dumps({'success': True, 'id': str(len(self.batches) - 1)}).encode('utf-8')
+
+    def firecrawl_batch_status(self, url, request):
+        """Every page of the job finished on the first poll"""
+        urls = self.batches[int(url.path.rsplit('/', 1)[1])]
+        page = json.loads(load_fixture('firecrawl_scrape.json'))['data']
+        data = [dict(page, metadata=dict(page['metadata'], sourceURL=source)) for source in urls]
+        return 'application/json', json.dumps({
+            'status': 'completed', 'total': len(urls), 'completed': len(urls), 'data': data
+        }).encode('utf-8')
+
+    def rss(self, name):
+        """Handler replaying one recorded feed; each distinct feed URL gets its own reworded items"""
+        def handler(url, request):
+            body = load_fixture(name).decode('utf-8')
+            if url.query:
+                seed = url.query
+                suffix = f'#{zlib.crc32(seed.encode("utf-8"))}'
+                body = re.sub(
+                    r'<(title|link|guid)( [^>]*)?>([^<]*)</\1>',
+                    lambda m: f'<{m.group(1)}{m.group(2) or ""}>'
+                              f'{reword(m.group(3), seed) if m.group(1) == "title" else m.group(3) + suffix}'
+                              f'</{m.group(1)}>',
+                    body
+                )
+            return 'application/rss+xml', body.encode('utf-8')
+        return handler
+
+    def reddit_search(self, url, request):
+        recorded = json.loads(load_fixture('reddit_search.json'))
+        children = []
+        for copy in range(self.scale):
+            for child in recorded['data']['children']:
+                if copy:
+                    data = child['data']
+                    post_id = f"{data['id']}{copy:03d}"
+                    child = {'kind': 't3', 'data': dict(
+                        data, id=post_id, name=f't3_{post_id}',
+                        title=reword(data['title'], f'{post_id}:title'),
+                        selftext=reword(data['selftext'], f'{post_id}:body'),
+                        permalink=data['permalink'].replace(data['id'], post_id)
+                    )}
+                children.append(child)
+        recorded['data']['children'] = children
+        recorded['data']['dist'] = len(children)
+        return 'application/json', json.dumps(recorded).encode('utf-8')
+
+def _copies(items, scale, **fields):
+    """`scale` copies of a config list; copy k > 0 gets each of `fields` suffixed so URLs stay distinct"""
+    result = list(items)
+    for copy in range(1, scale):
+        for item in items:
+            result.append(dict(item, **{field: f'{item[field]}{suffix.format(copy=copy)}' for field, suffix in fields.items()}))
+    return result
+
+@contextlib.contextmanager
+def scaled_inputs(scale):
+    """Multiply the watched foundations, feeds, partners and competitor pages for one run"""
+    originals = {
+        (grant_tracker, 'TARGET_FOUNDATIONS'): grant_tracker.TARGET_FOUNDATIONS,
+        (grant_tracker, 'PHILANTHROPY_FEEDS'): grant_tracker.PHILANTHROPY_FEEDS,
+        (partner_monitor, 'PARTNERS'): partner_monitor.PARTNERS,
+        (competitive_scraper, 'SIMILAR_ORGS'): competitive_scraper.SIMILAR_ORGS
+    }
+    grant_tracker.TARGET_FOUNDATIONS = _copies(
+        grant_tracker.TARGET_FOUNDATIONS, scale, name=' {copy}', url='?copy={copy}'
+    )
+    grant_tracker.PHILANTHROPY_FEEDS = [
+        url + (f'?copy={copy}' if copy else '') for copy in range(scale) for url in grant_tracker.PHILANTHROPY_FEEDS
+    ]
+    partner_monitor.PARTNERS = _copies(partner_monitor.PARTNERS, scale, name=' {copy}', website='?copy={copy}')
+    competitive_scraper.SIMILAR_ORGS = _copies(
+        competitive_scraper.SIMILAR_ORGS, scale, name=' {copy}', url='?copy={copy}'
+    )
+    try:
+        yield
+    finally:
+        for (module, name), value in originals.items():
+            setattr(module, name, value)
+
+@contextlib.contextmanager
+def fresh_workdir():
+    """Run inside an empty temporary directory (reports/ and .hti-state/ start empty)"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='hti-bench-') as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(cwd)
+
+def install_fixtures(adapter):
+    """Route the shared session and the Reddit client through `adapter`"""
+    session = get_session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    reddit_session = requests.Session()
+    reddit_session.mount('https://', adapter)
+    connect_reddit = reddit_digital_divide.connect_reddit
+    reddit_digital_divide.connect_reddit = lambda: connect_reddit(session=reddit_session)
+
+def run_once(adapter, scale, kinds, verbose=False):
+    """One timed pass over `kinds` and the digest; returns {kind: {'rows', 'total', 'stages'}}"""
+    adapter.scale = scale
+    reset_metrics()
+    reset_run_clock()
+    sentiment._memo = None
+    results = {}
+    frames = {}
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with fresh_workdir(), scaled_inputs(scale), output:
+        for kind in kinds:
+            start = time.perf_counter()
+            frames[kind] = run_all.COLLECTORS[kind].run_collector()
+            results[kind] = {'rows': len(frames[kind]), 'total': time.perf_counter() - start}
+
+        start = time.perf_counter()
+        send_email_digest.send_email(frames=frames)
+        results['digest'] = {'rows': sum(results[kind]['rows'] for kind in kinds), 'total': time.perf_counter() - start}
+
+    for kind, stages in stage_timings().items():
+        if kind in results:
+            results[kind]['stages'] = stages
+    return results
+
+def _summary(samples):
+    return {'median': statistics.median(samples), 'min': min(samples), 'runs': samples}
+
+def _fresh_python(*args):
+    """(wall seconds, stdout) of a new interpreter running `args` in the collectors directory"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *args], cwd=COLLECTORS_DIR, capture_output=True, text=True)
+    return time.perf_counter() - start, result.stdout
+
+def run_startup(repeat):
+    """{'rows', 'total', 'stages'} of startup timings; every sample runs in a fresh interpreter"""
+    samples = {'total': [], 'python': []}
+    for _ in range(repeat):
+        samples['total'].append(_fresh_python(os.path.join(COLLECTORS_DIR, 'run_all.py'), '--check')[0])
+        samples['python'].append(_fresh_python('-c', 'pass')[0])
+        for module in STARTUP_MODULES:
+            code = f'import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)'
+            samples.setdefault(module, []).append(float(_fresh_python('-c', code)[1]))
+    return {
+        'rows': 0,
+        'total': _summary(samples.pop('total')),
+        'stages': {name: _summary(values) for name, values in samples.items()}
+    }
+
+def run_benchmarks(scales=DEFAULT_SCALES, repeat=DEFAULT_REPEAT, kinds=None, verbose=False, startup=True):
+    """{kind: {scale: {'rows', 'total': summary, 'stages': {stage: summary}}}} plus run metadata"""
+    kinds = list(kinds or run_all.COLLECTORS)
+    adapter = FixtureAdapter()
+    install_fixtures(adapter)
+
+    # Untimed warm-up: lazy imports (textblob, pyarrow) and compiled patterns load here
+    run_once(adapter, 1, kinds, verbose)
+
+    results = {}
+    for scale in scales:
+        runs = [run_once(adapter, scale, kinds, verbose) for _ in range(repeat)]
+        for kind in runs[0]:
+            stage_names = sorted({name for run in runs for name in run[kind].get('stages', {})})
+            results.setdefault(kind, {})[str(scale)] = {
+                'rows': runs[-1][kind]['rows'],
+                'total': _summary([run[kind]['total'] for run in runs]),
+                'stages': {name: _summary([run[kind].get('stages', {}).get(name, 0.0) for run in runs])
+                           for name in stage_names}
+            }
+        print(f"  {scale}x done ({repeat} runs)", file=sys.stderr)
+
+    if startup:
+        results['startup'] = {'1': run_startup(repeat)}
+        print(f"  startup done ({repeat} runs)", file=sys.stderr)
+
+    return {'meta': run_metadata(scales, repeat), 'results': results}
+
+def run_metadata(scales, repeat):
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created_at': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pandas.__version__,
+        'numpy': numpy.__version__,
+        'scales': list(scales),
+        'repeat': repeat
+    }
+
+def iter_rows(report):
+    """(kind, scale, stage, summary) for every measurement, 'total' first within a kind/scale"""
+    for kind, by_scale in report['results'].items():
+        for scale, result in by_scale.items():
+            yield kind, scale, 'total', result['total']
+            for name, summary in result['stages'].items():
+                yield kind, scale, name, summary
+
+def _stage_width(report):
+    return max([8] + [len(name) + 1 for _, _, name, _ in iter_rows(report)])
+
+def print_report(report):
+    width = _stage_width(report)
+    print(f"{'kind':<16}{'scale':>6}  {'stage':<{width}}{'median ms':>11}{'min ms':>10}")
+    for kind, scale, name, summary in iter_rows(report):
+        print(f"{kind:<16}{scale + 'x':>6}  {name:<{width}}{summary['median'] * 1000:>11.1f}{summary['min'] * 1000:>10.1f}")
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Print median changes between two reports; returns the regressions beyond `threshold`"""
+    base = {(kind, scale, name): summary for kind, scale, name, summary in iter_rows(baseline)}
+    regressions = []
+    width = _stage_width(current)
+    print(f"{'kind':<16}{'scale':>6}  {'stage':<{width}}{'base ms':>10}{'new ms':>10}{'ratio':>8}")
+    for kind, scale, name, summary in iter_rows(current):
+        old = base.get((kind, scale, name))
+        if old is None:
+            continue
+        ratio = summary['median'] / old['median'] if old['median'] else float('inf')
+        regressed = ratio > threshold and summary['median'] - old['median'] > NOISE_FLOOR
+        if regressed:
+            regressions.append((kind, scale, name, ratio))
+        print(f"{kind:<16}{scale + 'x':>6}  {name:<{width}}{old['median'] * 1000:>10.1f}"
+              f"{summary['median'] * 1000:>10.1f}{ratio:>7.2f}x{'  ⚠️' if regressed else ''}")
+    print(f"\n{len(regressions)} regression(s) over {threshold:.2f}x "
+          f"(baseline {baseline['meta'].get('commit')}, current {current['meta'].get('commit')})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the HTI collectors against recorded fixtures')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)), help='comma-separated input multipliers')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='timed runs per scale')
+    parser.add_argument('--kinds', help=f"comma-separated collectors (default: {','.join(run_all.COLLECTORS)})")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where to write the JSON results')
+    parser.add_argument('--compare', metavar='BASELINE', help='diff the new results against a saved baseline')
+    parser.add_argument('--diff', nargs=2, metavar=('BASELINE', 'CURRENT'), help='diff two saved results without running')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='median ratio counted as a regression')
+    parser.add_argument('--verbose', action='store_true', help='show collector output')
+    parser.add_argument('--no-startup', action='store_true', help='skip the import-time / --check measurements')
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        with open(args.diff[0]) as f, open(args.diff[1]) as g:
+            return 1 if compare(json.load(f), json.load(g), args.threshold) else 0
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    kinds = args.kinds.split(',') if args.kinds else None
+    report = run_benchmarks(scales, args.repeat, kinds, args.verbose, startup=not args.no_startup)
+
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"\n💾 Results saved to {output}")
+
+    if baseline is not None:
+        print()
+        return 1 if compare(baseline, report, args.threshold) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,15 +2,19 @@
 """
 HTI Competitive Intelligence Scraper
 Uses Firecrawl to monitor similar orgs (PCs for People, Human-I-T, etc.)
-Free tier optimized - only scrapes 3 pages per run
+Free tier optimized - scrapes until the per-run credit budget is spent, serving
+unchanged pages from the scrape cache and rotating coverage through the watch list
 """
-import os
-import requests
-import pandas as pd
-from datetime import datetime
-
-FIRECRAWL_API_KEY = os.getenv('FIRECRAWL_API_KEY')
-FIRECRAWL_URL = 'https://api.firecrawl.dev/v1'
+import sys
+import re
+from firecrawl_client import FIRECRAWL_API_KEY, FirecrawlClient
+from scrape_cache import ScrapeCache
+from keyword_matcher import KeywordMatcher
+from history_store import REPORT_KEYS, HistoryStore
+from report_io import write_report
+from report_schema import apply_schema
+from records import CompetitorSnapshot, records_frame, run_clock
+from metrics import stage
 
 # Similar organizations to monitor
 SIMILAR_ORGS = [
@@ -46,59 +50,26 @@ SIMILAR_ORGS = [
     }
 ]
 
-def firecrawl_scrape(url):
-    """Scrape a URL with Firecrawl"""
-    if not FIRECRAWL_API_KEY:
-        return None
-    
-    try:
-        response = requests.post(
-            f'{FIRECRAWL_URL}/scrape',
-            headers={
-                'Authorization': f'Bearer {FIRECRAWL_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'url': url,
-                'formats': ['markdown'],
-                'onlyMainContent': True
-            },
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            return response.json().get('data', {})
-        elif response.status_code == 429:
-            print(f"  ⚠️ Rate limited")
-        return None
-    except Exception as e:
-        print(f"  ⚠️ Error: {e}")
-        return None
+# Insight label -> signal keywords, scanned in one pass per page
+ACTIVITY_MATCHER = KeywordMatcher({
+    'Expansion activity detected': ['expand', 'new location', 'launch', 'opening'],
+    'Funding/grant news': ['grant', 'funding', 'million', 'donation'],
+    'Partnership activity': ['partner', 'collaborate', 'join'],
+    'New programs/services': ['program', 'initiative', 'service']
+})
+
+IMPACT_PATTERN = re.compile(
+    r'\d{1,3}(?:,\d{3})+|\d+(?:,\d+)*\s*(?:devices?|computers?|laptops?|families?|students?)',
+    re.IGNORECASE
+)
 
 def analyze_org_activity(org, markdown):
     """Analyze scraped content for insights"""
-    insights = []
-    content_lower = markdown.lower()
-    
-    # Check for expansion signals
-    if any(word in content_lower for word in ['expand', 'new location', 'launch', 'opening']):
-        insights.append('Expansion activity detected')
-    
-    # Check for funding
-    if any(word in content_lower for word in ['grant', 'funding', 'million', 'donation']):
-        insights.append('Funding/grant news')
-    
-    # Check for partnerships
-    if any(word in content_lower for word in ['partner', 'collaborate', 'join']):
-        insights.append('Partnership activity')
-    
-    # Check for programs
-    if any(word in content_lower for word in ['program', 'initiative', 'service']):
-        insights.append('New programs/services')
+    hits = ACTIVITY_MATCHER.scan(markdown)
+    insights = [label for label in ACTIVITY_MATCHER.table if label in hits]
     
     # Check for impact numbers
-    import re
-    numbers = re.findall(r'\d{1,3}(?:,\d{3})+|\d+(?:,\d+)*\s*(?:devices?|computers?|laptops?|families?|students?)', content_lower)
+    numbers = IMPACT_PATTERN.findall(markdown)
     if numbers:
         insights.append(f'Impact metrics: {numbers[:3]}')
     
@@ -111,68 +82,85 @@ def run_collector():
     
     if not FIRECRAWL_API_KEY:
         print("   Skipping - no API key")
-        return pd.DataFrame()
+        return records_frame([], CompetitorSnapshot)
     
     results = []
+    cache = ScrapeCache('competitors')
+    firecrawl = FirecrawlClient(cache=cache)
     
-    # Only scrape 3 orgs to conserve free tier credits
-    orgs_to_scrape = SIMILAR_ORGS[:3]
-    
-    print(f"\n🔥 Scraping {len(orgs_to_scrape)} competitor pages...")
+    print(f"\n🔥 Scraping competitor pages (budget: {firecrawl.ledger.budget} credits)...")
     
-    for org in orgs_to_scrape:
-        print(f"  Checking {org['name']}...")
+    with stage('competitors', 'fetch'):
+        # Stalest pages first so the budget rotates through every org over the cache TTL
+        orgs = cache.rotation_order(SIMILAR_ORGS)
+        by_url = {org['url']: org for org in orgs}
+        scraped_rows = {}
         
-        # Scrape main page
-        scraped = firecrawl_scrape(org['url'])
-        
-        if scraped:
-            markdown = scraped.get('markdown', '')
-            insights = analyze_org_activity(org, markdown)
+        # One batch job for everything the budget covers; each page is analyzed as soon as it is back
+        for url, scraped in firecrawl.scrape_many(firecrawl.affordable(list(by_url))):
+            org = by_url[url]
+            print(f"  Checked {org['name']}{' (cached)' if scraped and scraped.get('cached') else ''}")
             
-            results.append({
-                'Organization': org['name'],
-                'Type': org['type'],
-                'URL': org['url'],
-                'Insights': '; '.join(insights),
-                'Content_Length': len(markdown),
-                'Last_Scraped': datetime.now().isoformat(),
-                'Status': 'Scraped'
-            })
-        else:
-            results.append({
-                'Organization': org['name'],
-                'Type': org['type'],
-                'URL': org['url'],
-                'Insights': 'Scrape failed - check manually',
-                'Content_Length': 0,
-                'Last_Scraped': datetime.now().isoformat(),
-                'Status': 'Failed'
-            })
-    
-    # Add remaining orgs as watch list (not scraped)
-    for org in SIMILAR_ORGS[3:]:
-        results.append({
-            'Organization': org['name'],
-            'Type': org['type'],
-            'URL': org['url'],
-            'Insights': 'On watch list - not scraped this run',
-            'Content_Length': 0,
-            'Last_Scraped': datetime.now().isoformat(),
-            'Status': 'Watch List'
-        })
+            if scraped:
+                markdown = scraped.get('markdown', '')
+                insights = analyze_org_activity(org, markdown)
+                
+                scraped_rows[url] = CompetitorSnapshot(
+                    Organization=org['name'],
+                    Type=org['type'],
+                    URL=url,
+                    Insights='; '.join(insights),
+                    Content_Length=len(markdown),
+                    Last_Scraped=scraped.get('fetched_at') or run_clock(),
+                    Status='Scraped'
+                )
+            else:
+                scraped_rows[url] = CompetitorSnapshot(
+                    Organization=org['name'],
+                    Type=org['type'],
+                    URL=url,
+                    Insights='Scrape failed - check manually',
+                    Content_Length=0,
+                    Last_Scraped=run_clock(),
+                    Status='Failed'
+                )
+        
+        for org in orgs:
+            if org['url'] in scraped_rows:
+                results.append(scraped_rows[org['url']])
+            else:
+                # Orgs beyond the credit budget stay on the watch list (not scraped)
+                results.append(CompetitorSnapshot(
+                    Organization=org['name'],
+                    Type=org['type'],
+                    URL=org['url'],
+                    Insights='On watch list - not scraped this run',
+                    Content_Length=0,
+                    Last_Scraped=run_clock(),
+                    Status='Watch List'
+                ))
+        
+        cache.save()
     
-    df = pd.DataFrame(results)
+    with stage('competitors', 'build'):
+        df = apply_schema(records_frame(results, CompetitorSnapshot), 'competitors')
     
-    os.makedirs('reports', exist_ok=True)
-    filename = f"reports/competitors-{datetime.now().strftime('%Y-%m-%d')}.csv"
-    df.to_csv(filename, index=False)
+    with stage('competitors', 'write'):
+        filename = write_report(df, 'competitors')
     
     scraped_count = len(df[df['Status'] == 'Scraped'])
     print(f"\n✅ Saved {len(df)} orgs to {filename}")
     print(f"   Deep scraped: {scraped_count}")
+    print(f"   Firecrawl credits used: {firecrawl.ledger.spent}/{firecrawl.ledger.budget}")
+    
+    with stage('competitors', 'store'), HistoryStore() as store:
+        history = store.upsert('competitors', df, REPORT_KEYS['competitors'])
+    print(f"   Changed since last run: {history['new'] + history['changed']}")
     
     return df
 
 if __name__ == '__main__':
+    if '--check' in sys.argv:
+        from config_check import run_check
+        sys.exit(run_check(['competitors']))
     run_collector()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+HTI Config Check
+The `--check` mode of run_all and the collector scripts. It reports which
+credentials each stage is missing, whether the module-level settings
+(FIRECRAWL_CREDITS_PER_RUN, ...) parse, and whether the state and reports
+directories are writable.
+
+Numeric settings are read through `env_number`, so a malformed value falls
+back to its default instead of failing the import, and the check reports it.
+
+It reads only the environment and the filesystem and makes no network calls.
+Collectors defer pandas, requests, praw and textblob to first use, so a check
+finishes in tens of milliseconds.
+
+    python collectors/run_all.py --check
+    python collectors/grant_tracker.py --check
+"""
+import importlib
+import os
+import sys
+from state import STATE_DIR
+
+# Stage -> module whose import-time settings are validated
+MODULES = {
+    'grants': 'grant_tracker',
+    'digital-divide': 'reddit_digital_divide',
+    'partners': 'partner_monitor',
+    'competitors': 'competitive_scraper',
+    'digest': 'send_email_digest'
+}
+
+# Stage -> [(env var, 'error' or 'warn', what happens without it)]; errors make the check fail
+CREDENTIALS = {
+    'grants': [('FIRECRAWL_API_KEY', 'warn', 'foundation pages stay on the watch list')],
+    'digital-divide': [
+        ('REDDIT_CLIENT_ID', 'error', 'Reddit search fails'),
+        ('REDDIT_CLIENT_SECRET', 'error', 'Reddit search fails')
+    ],
+    'partners': [],
+    'competitors': [('FIRECRAWL_API_KEY', 'warn', 'collector is skipped')],
+    'digest': [
+        ('RESEND_API_KEY', 'error', 'digest is not sent'),
+        ('DIGEST_EMAIL', 'warn', 'digest goes to the default address')
+    ]
+}
+
+# Numeric env settings that didn't parse: name -> (raw value, default used instead)
+INVALID_SETTINGS = {}
+
+# Libraries a check must not load (they are what makes a full run slow to start)
+HEAVY_MODULES = ('pandas', 'numpy', 'requests', 'praw', 'textblob', 'pyarrow', 'feedparser')
+
+def env_number(name, default, cast=int):
+    """Numeric env setting; a malformed value warns, uses `default` and fails the check"""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        return cast(raw)
+    except ValueError:
+        INVALID_SETTINGS[name] = (raw, default)
+        print(f"⚠️ {name}={raw!r} is not a number - using {default}")
+        return default
+
+def _writable(path):
+    """True if `path` exists and is writable, or could be created under a writable parent"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return False
+        path = parent
+    return os.path.isdir(path) and os.access(path, os.W_OK)
+
+def check_config(kinds=None):
+    """[(level, message)] for the given stages (default: all); level is 'ok', 'warn' or 'error'"""
+    from report_io import REPORTS_DIR
+    kinds = list(kinds or MODULES)
+    results = []
+
+    for kind in kinds:
+        if kind not in MODULES:
+            results.append(('error', f"{kind}: unknown stage (one of {', '.join(MODULES)})"))
+            continue
+        try:
+            importlib.import_module(MODULES[kind])
+        except Exception as e:
+            results.append(('error', f"{kind}: settings don't load ({type(e).__name__}: {e})"))
+            continue
+        missing = [(name, level, effect) for name, level, effect in CREDENTIALS[kind] if not os.getenv(name)]
+        for name, level, effect in missing:
+            results.append((level, f"{kind}: {name} not set - {effect}"))
+        if not missing:
+            results.append(('ok', f"{kind}: configured"))
+
+    for name, (raw, default) in INVALID_SETTINGS.items():
+        results.append(('error', f"{name}={raw!r} is not a number (runs would use {default})"))
+
+    for label, path in (('state', STATE_DIR), ('reports', REPORTS_DIR)):
+        if _writable(path):
+            results.append(('ok', f"{label} directory {path} writable"))
+        else:
+            results.append(('error', f"{label} directory {path} not writable"))
+    return results
+
+def run_check(kinds=None):
+    """Print the check for `kinds`; returns the process exit code (1 if anything would fail)"""
+    results = check_config(kinds)
+    icons = {'ok': '✅', 'warn': '⚠️', 'error': '❌'}
+    print("🩺 HTI config check")
+    for level, message in results:
+        print(f"  {icons[level]} {message}")
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    if loaded:
+        print(f"  ⚠️ check imported {', '.join(loaded)} - an import is no longer lazy")
+    errors = sum(level == 'error' for level, _ in results)
+    print(f"   {errors} error(s)")
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(run_check(sys.argv[1:] or None))
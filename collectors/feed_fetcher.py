@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+HTI Feed Fetcher
+Fetches RSS feeds concurrently over the shared session with conditional GETs.
+Each feed's ETag / Last-Modified and recently seen entry ids are kept between
+runs, so a 304 skips parsing and only never-seen entries are returned.
+Callers commit the returned state updates only once their report is written,
+so a failed run sees the same entries again.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from state import state_path
+from config_check import env_number
+from metrics import submit
+
+FEED_STATE = 'feed-state.json'
+FEED_CONCURRENCY = env_number('FEED_CONCURRENCY', 8)
+FEED_TIMEOUT = 30
+MAX_SEEN_PER_FEED = 500
+
+_state_lock = threading.Lock()
+
+def load_feed_state():
+    path = state_path(FEED_STATE)
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+def commit_feed_state(updates):
+    """Merge per-feed updates from fetch_feeds into the state file (collectors may run concurrently)"""
+    if not updates:
+        return
+    with _state_lock:
+        state = load_feed_state()
+        state.update(updates)
+        path = state_path(FEED_STATE)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(f'{path}.tmp', path)
+
+def entry_id(entry):
+    return entry.get('id') or entry.get('link') or entry.get('title', '')
+
+def _fetch(session, url, feed_state, limit):
+    """(new entries, updated feed state) for one feed"""
+    headers = {}
+    if feed_state.get('etag'):
+        headers['If-None-Match'] = feed_state['etag']
+    if feed_state.get('modified'):
+        headers['If-Modified-Since'] = feed_state['modified']
+
+    response = session.get(url, headers=headers, timeout=FEED_TIMEOUT)
+    if response.status_code == 304:
+        return [], feed_state
+    response.raise_for_status()
+
+    import feedparser
+    feed = feedparser.parse(response.content)
+    entries = feed.entries[:limit] if limit else feed.entries
+    seen = feed_state.get('seen', [])
+    seen_set = set(seen)
+    new_entries = [entry for entry in entries if entry_id(entry) not in seen_set]
+
+    seen = seen + [entry_id(entry) for entry in new_entries]
+    return new_entries, {
+        'etag': response.headers.get('ETag'),
+        'modified': response.headers.get('Last-Modified'),
+        'seen': seen[-MAX_SEEN_PER_FEED:]
+    }
+
+def fetch_feeds(urls, limit=None, max_workers=None):
+    """Fetch feeds concurrently; returns ({url: [entries not seen in earlier runs]}, state updates)
+
+    Pass the updates to commit_feed_state() once the entries are safely written.
+    """
+    from http_session import get_session
+    session = get_session()
+    state = load_feed_state()
+    results = {url: [] for url in urls}
+    updates = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers or FEED_CONCURRENCY) as pool:
+        futures = {submit(pool, _fetch, session, url, state.get(url, {}), limit): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url], updates[url] = future.result()
+            except Exception as e:
+                print(f"  ⚠️ Feed failed {url}: {e}")
+
+    return results, updates
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+HTI Firecrawl Client
+Shared by grant_tracker and competitive_scraper: pooled session, free-tier
+token-bucket rate limiting, Retry-After aware backoff, a per-run credit ledger
+and an optional on-disk scrape cache (cache hits cost zero credits).
+Structured extraction (5 credits a page) draws on its own, separate budget so
+it never crowds out the cheap markdown scrapes.
+Watchlists go out as one batch-scrape job whose pages are handed back as they
+finish, with per-URL scrapes as the fallback.
+"""
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from config_check import env_number
+from metrics import add
+
+FIRECRAWL_API_KEY = os.getenv('FIRECRAWL_API_KEY')
+FIRECRAWL_URL = os.getenv('FIRECRAWL_URL', 'https://api.firecrawl.dev/v1')
+
+# Free tier allows 10 scrapes/min; each collector gets a small credit budget per run
+RATE_PER_MINUTE = env_number('FIRECRAWL_RATE_PER_MINUTE', 10)
+CREDITS_PER_RUN = env_number('FIRECRAWL_CREDITS_PER_RUN', 3)
+EXTRACT_CREDITS_PER_RUN = env_number('FIRECRAWL_EXTRACT_CREDITS_PER_RUN', 10)
+SCRAPE_CREDITS = 1
+EXTRACT_CREDITS = 5
+
+# Batch scrape: one job per watchlist, polled with backoff (FIRECRAWL_BATCH=0 scrapes one URL at a time)
+FIRECRAWL_BATCH = os.getenv('FIRECRAWL_BATCH', '1') != '0'
+BATCH_POLL_INITIAL = 1
+BATCH_POLL_MAX = 10
+BATCH_POLL_BACKOFF = 1.5
+BATCH_MAX_WAIT = 300
+BATCH_DONE = ('completed', 'failed', 'cancelled')
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 2
+BACKOFF_CAP = 60
+REQUEST_TIMEOUT = 30
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per `per` seconds, bursts up to `capacity`"""
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = rate / per
+        self.capacity = capacity or rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One bucket per process: the free-tier limit applies to the API key, not to each collector
+_shared_bucket = TokenBucket(RATE_PER_MINUTE)
+
+
+class CreditLedger:
+    """Tracks Firecrawl credits spent in one run against a fixed budget"""
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = []
+        self.lock = threading.Lock()
+
+    @property
+    def spent(self):
+        return sum(credits for _, credits in self.entries)
+
+    @property
+    def remaining(self):
+        return max(self.budget - self.spent, 0)
+
+    def can_spend(self, credits):
+        return self.remaining >= credits
+
+    def charge(self, url, credits):
+        with self.lock:
+            self.entries.append((url, credits))
+
+
+def retry_after_seconds(response, attempt):
+    """Seconds to wait before retrying, honouring Retry-After when present"""
+    header = response.headers.get('Retry-After') if response is not None else None
+    if header:
+        try:
+            return min(float(header), BACKOFF_CAP)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(header).timestamp() - time.time()
+                return min(max(delay, 0), BACKOFF_CAP)
+            except (TypeError, ValueError):
+                pass
+    return min(BACKOFF_BASE ** attempt, BACKOFF_CAP)
+
+
+class FirecrawlClient:
+    """Budgeted Firecrawl client (conserve free tier credits)"""
+
+    def __init__(self, api_key=None, budget=CREDITS_PER_RUN, session=None, bucket=None, cache=None, batch=FIRECRAWL_BATCH,
+                 extract_budget=EXTRACT_CREDITS_PER_RUN):
+        from http_session import get_session
+        self.api_key = api_key if api_key is not None else FIRECRAWL_API_KEY
+        self.session = session or get_session()
+        self.bucket = bucket or _shared_bucket
+        self.ledger = CreditLedger(budget)
+        self.extract_ledger = CreditLedger(extract_budget)
+        self.cache = cache
+        self.batch = batch
+
+    @property
+    def enabled(self):
+        return bool(self.api_key)
+
+    def is_cached(self, url):
+        return self.cache is not None and self.cache.get(url) is not None
+
+    def can_scrape(self, url=None, extract=False):
+        """True if `url` is served from cache or the run budget still covers one more scrape (or extraction)"""
+        if not self.enabled:
+            return False
+        if extract:
+            return self.extract_ledger.can_spend(EXTRACT_CREDITS)
+        if url and self.is_cached(url):
+            return True
+        return self.ledger.can_spend(SCRAPE_CREDITS)
+
+    def affordable(self, urls):
+        """The URLs, in order, this run can scrape: cached ones plus as many others as the budget covers"""
+        if not self.enabled:
+            return []
+        budget = self.ledger.remaining
+        result = []
+        for url in urls:
+            if self.is_cached(url):
+                result.append(url)
+            elif budget >= SCRAPE_CREDITS:
+                budget -= SCRAPE_CREDITS
+                result.append(url)
+        return result
+
+    def _request(self, method, path, payload=None):
+        """Request with rate limiting and Retry-After aware retries; `path` may be a full URL"""
+        url = path if path.startswith('http') else f'{FIRECRAWL_URL}{path}'
+        response = None
+        for attempt in range(MAX_RETRIES + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    headers={
+                        'Authorization': f'Bearer {self.api_key}',
+                        'Content-Type': 'application/json'
+                    },
+                    json=payload,
+                    timeout=REQUEST_TIMEOUT
+                )
+            except Exception as e:
+                if attempt == MAX_RETRIES:
+                    print(f"  ⚠️ Firecrawl failed: {e}")
+                    return None
+                time.sleep(retry_after_seconds(None, attempt))
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == MAX_RETRIES:
+                    break
+                delay = retry_after_seconds(response, attempt)
+                print(f"  ⏳ Firecrawl {response.status_code} - retrying in {delay:.0f}s")
+                time.sleep(delay)
+                continue
+            return response
+
+        print(f"  ⚠️ Firecrawl gave up after {MAX_RETRIES} retries ({response.status_code})")
+        return None
+
+    def scrape(self, url, extract_schema=None):
+        """Scrape a URL (cache first), charging the run ledger; returns the `data` dict or None
+
+        With `extract_schema` the page is never served from cache and the
+        extraction budget is charged instead.
+        """
+        cost = EXTRACT_CREDITS if extract_schema else SCRAPE_CREDITS
+        ledger = self.extract_ledger if extract_schema else self.ledger
+        if not self.enabled:
+            return None
+
+        use_cache = self.cache is not None and not extract_schema
+        if use_cache:
+            entry = self.cache.get(url)
+            if entry:
+                add('firecrawl_cache_hits')
+                return {'markdown': entry['markdown'], 'cached': True, 'fetched_at': entry['fetched_at']}
+
+        if not ledger.can_spend(cost):
+            print(f"  💳 Firecrawl budget exhausted ({ledger.spent}/{ledger.budget}) - skipping {url}")
+            return None
+
+        payload = {
+            'url': url,
+            'formats': ['markdown'],
+            'onlyMainContent': True
+        }
+
+        # If we want structured extraction
+        if extract_schema:
+            payload['formats'] = ['markdown', 'extract']
+            payload['extract'] = {'schema': extract_schema}
+
+        response = self._request('POST', '/scrape', payload)
+        if response is None:
+            return None
+        if response.status_code != 200:
+            print(f"  ⚠️ Firecrawl error {response.status_code}")
+            return None
+
+        ledger.charge(url, cost)
+        add('firecrawl_credits', cost)
+        data = response.json().get('data', {})
+        if use_cache:
+            data['changed'] = self.cache.put(url, data.get('markdown', ''))
+            data['changed_sections'] = self.cache.changed_sections(url)
+        return data
+
+    def _page(self, url, data):
+        """Charge and cache one scraped page; returns its `data` dict"""
+        self.ledger.charge(url, SCRAPE_CREDITS)
+        add('firecrawl_credits', SCRAPE_CREDITS)
+        if self.cache is not None:
+            data['changed'] = self.cache.put(url, data.get('markdown', ''))
+            data['changed_sections'] = self.cache.changed_sections(url)
+        return data
+
+    def scrape_many(self, urls):
+        """Yield (url, data or None) for every URL as its page becomes available
+
+        Cached pages come first and cost nothing. The rest go out as one batch
+        job whose pages are yielded while it runs; a single URL, a disabled
+        batch mode or a batch endpoint that refuses the job falls back to
+        per-URL scrapes. Pass only URLs `affordable` returned.
+        """
+        if not self.enabled:
+            return
+        pending = []
+        for url in urls:
+            entry = self.cache.get(url) if self.cache is not None else None
+            if entry:
+                add('firecrawl_cache_hits')
+                yield url, {'markdown': entry['markdown'], 'cached': True, 'fetched_at': entry['fetched_at']}
+            else:
+                pending.append(url)
+
+        if self.batch and len(pending) > 1:
+            pending = yield from self._batch_scrape(pending)
+        for url in pending:
+            yield url, self.scrape(url)
+
+    def _batch_scrape(self, urls):
+        """Run one batch job, yielding (url, data or None) as pages finish; returns URLs left to scrape singly"""
+        response = self._request('POST', '/batch/scrape', {
+            'urls': urls,
+            'formats': ['markdown'],
+            'onlyMainContent': True
+        })
+        job_id = response.json().get('id') if response is not None and response.status_code == 200 else None
+        if not job_id:
+            # Don't ask again for this client's later watchlists
+            self.batch = False
+            print(f"  ↩️ Firecrawl batch unavailable ({response.status_code if response is not None else 'no response'}) - scraping one URL at a time")
+            return urls
+
+        # Pages report the URL they were requested as, give or take a trailing slash
+        remaining = {url.rstrip('/'): url for url in urls}
+        deadline = time.monotonic() + BATCH_MAX_WAIT
+        delay = BATCH_POLL_INITIAL
+        while remaining:
+            state, documents = self._batch_status(job_id)
+            for document in documents:
+                metadata = document.get('metadata') or {}
+                url = remaining.pop(str(metadata.get('sourceURL') or metadata.get('url') or '').rstrip('/'), None)
+                if url is None:
+                    continue
+                if document.get('markdown') and (metadata.get('statusCode') or 200) < 400:
+                    yield url, self._page(url, {k: v for k, v in document.items() if k != 'metadata'})
+                else:
+                    yield url, None
+
+            if state is None or state in BATCH_DONE:
+                if state == 'completed':
+                    break
+                print(f"  ↩️ Firecrawl batch {state or 'status unavailable'} - scraping {len(remaining)} pages one at a time")
+                return list(remaining.values())
+            if time.monotonic() + delay > deadline:
+                print(f"  ⚠️ Firecrawl batch still running after {BATCH_MAX_WAIT}s - {len(remaining)} pages skipped")
+                break
+            time.sleep(delay)
+            delay = min(delay * BATCH_POLL_BACKOFF, BATCH_POLL_MAX)
+
+        # Completed (or timed out) without these pages: they failed, and a retry would cost credits again
+        for url in remaining.values():
+            yield url, None
+        return []
+
+    def _batch_status(self, job_id):
+        """(status, documents so far) of a batch job, following `next` pages; (None, []) on failure"""
+        response = self._request('GET', f'/batch/scrape/{job_id}')
+        if response is None or response.status_code != 200:
+            return None, []
+        body = response.json()
+        documents = list(body.get('data') or [])
+        while body.get('next'):
+            response = self._request('GET', body['next'])
+            if response is None or response.status_code != 200:
+                break
+            body = response.json()
+            documents.extend(body.get('data') or [])
+        return body.get('status'), documents
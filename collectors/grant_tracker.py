@@ -4,14 +4,36 @@ HTI Grant Opportunity Tracker v2
 Now with Firecrawl for deep grant page scraping (free tier optimized)
 """
 import os
-import requests
-import pandas as pd
-from datetime import datetime
-import feedparser
+import sys
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 import json
+from config_check import env_number
+from firecrawl_client import FIRECRAWL_API_KEY, MAX_RETRIES, FirecrawlClient, retry_after_seconds
+from scrape_cache import ScrapeCache, split_sections
+from keyword_matcher import KeywordMatcher
+from relevance_rank import RelevanceRanker
+from feed_fetcher import commit_feed_state, fetch_feeds
+from near_dup import collapse_near_duplicates
+from history_store import REPORT_KEYS, HistoryStore
+from report_io import write_report
+from report_schema import apply_schema, due_within, sort_report
+from records import Opportunity, records_frame, run_clock
+from metrics import stage, submit
 
-FIRECRAWL_API_KEY = os.getenv('FIRECRAWL_API_KEY')
-FIRECRAWL_URL = 'https://api.firecrawl.dev/v1'
+GRANTS_GOV_URL = os.getenv('GRANTS_GOV_URL', 'https://www.grants.gov/grantsws/rest/opportunities/search')
+GRANTS_GOV_DETAIL_URL = 'https://www.grants.gov/search-results-detail/'
+GRANTS_GOV_CONCURRENCY = env_number('GRANTS_GOV_CONCURRENCY', 4)
+GRANTS_GOV_TIMEOUT = 30
+# Pages of newest-first results per keyword, up to a cap; paging stops at already-stored opportunities
+GRANTS_GOV_PAGE_SIZE = env_number('GRANTS_GOV_PAGE_SIZE', 25)
+GRANTS_GOV_MAX_RECORDS = env_number('GRANTS_GOV_MAX_RECORDS', 200)
+# Opportunities paging stopped short of stay in the report this long after they were first seen
+GRANTS_GOV_CARRY_DAYS = env_number('GRANTS_GOV_CARRY_DAYS', 90)
+DUE_SOON_DAYS = 30
 
 KEYWORDS = [
     'digital equity', 'digital divide', 'technology access',
@@ -19,6 +41,34 @@ KEYWORDS = [
     'broadband access', 'nonprofit technology', 'underserved communities'
 ]
 
+# What HTI funds look like; every opportunity is ranked by TF-IDF similarity to it
+HTI_PROFILE = (
+    'HubZone Technology Initiative refurbishes donated computers and laptops for low-income '
+    'families, students, seniors and veterans in North Carolina. Digital equity, digital divide, '
+    'digital literacy training, device access, broadband and technology access for underserved '
+    'rural communities, computer donation and education technology for nonprofits and schools.'
+)
+
+# Compiled once; scored in a single pass per text
+RELEVANCE_MATCHER = KeywordMatcher({
+    'high': ['digital equity', 'digital divide', 'computer', 'chromebook', 'laptop', 'device'],
+    'medium': ['technology', 'education', 'underserved', 'low-income', 'rural', 'broadband'],
+    'nc': ['north carolina', 'nc']
+})
+
+# Also decides which page sections are grant-relevant: a change there triggers schema extraction
+PAGE_SIGNAL_MATCHER = KeywordMatcher({
+    'deadline': ['deadline', 'due date', 'submit by'],
+    'amount': ['$', 'award', 'grant amount', 'funding'],
+    'eligibility': ['eligibility', 'eligible', 'apply', 'application']
+})
+
+NEWS_TOPIC_MATCHER = KeywordMatcher({
+    'topic': ['digital', 'technology', 'computer', 'education', 'equity', 'grant']
+})
+
+PHILANTHROPY_FEEDS = ['https://philanthropynewsdigest.org/news.rss']
+
 TARGET_FOUNDATIONS = [
     {'name': 'Google.org', 'url': 'https://www.google.org/grants/'},
     {'name': 'Microsoft Philanthropies', 'url': 'https://www.microsoft.com/en-us/corporate-responsibility/philanthropies'},
@@ -31,47 +81,7 @@ TARGET_FOUNDATIONS = [
     {'name': 'Blue Cross NC Foundation', 'url': 'https://www.bcbsncfoundation.org/grants/'}
 ]
 
-def firecrawl_scrape(url, extract_schema=None):
-    """Scrape a URL with Firecrawl (conserve free tier credits)"""
-    if not FIRECRAWL_API_KEY:
-        return None
-    
-    try:
-        payload = {
-            'url': url,
-            'formats': ['markdown'],
-            'onlyMainContent': True
-        }
-        
-        # If we want structured extraction
-        if extract_schema:
-            payload['extract'] = {'schema': extract_schema}
-        
-        response = requests.post(
-            f'{FIRECRAWL_URL}/scrape',
-            headers={
-                'Authorization': f'Bearer {FIRECRAWL_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('data', {})
-        elif response.status_code == 429:
-            print(f"  ⚠️ Firecrawl rate limit - skipping deep scrape")
-            return None
-        else:
-            print(f"  ⚠️ Firecrawl error {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"  ⚠️ Firecrawl failed: {e}")
-        return None
-
-def extract_grant_details(url):
+def extract_grant_details(url, client):
     """Use Firecrawl to extract structured grant info"""
     schema = {
         'type': 'object',
@@ -86,151 +96,259 @@ def extract_grant_details(url):
         }
     }
     
-    result = firecrawl_scrape(url, extract_schema=schema)
+    result = client.scrape(url, extract_schema=schema)
     if result and result.get('extract'):
         return result['extract']
     return None
 
-def search_grants_gov():
-    """Search Grants.gov for relevant opportunities"""
-    results = []
-    base_url = 'https://www.grants.gov/grantsws/rest/opportunities/search'
-    
-    for keyword in KEYWORDS[:3]:  # Limit API calls
+def grant_section_changes(markdown, changed_sections):
+    """Changed sections that mention deadlines, amounts or eligibility (removed sections always count)"""
+    sections = dict(split_sections(markdown))
+    return [
+        name for name in changed_sections
+        if name not in sections or PAGE_SIGNAL_MATCHER.scan(name, sections[name])
+    ]
+
+def grant_amount(details):
+    """'min - max' (or whichever is known) from an extraction, or None"""
+    low, high = details.get('amount_min'), details.get('amount_max')
+    if low and high and low != high:
+        return f"{low} - {high}"
+    return low or high or None
+
+def grants_gov_url(opp_id):
+    """Detail page of an opportunity (the report and history key)"""
+    return f"{GRANTS_GOV_DETAIL_URL}{opp_id}"
+
+def _grants_gov_row(opp):
+    """Convert one Grants.gov hit into a report row (Relevance is filled in by score_grants)"""
+    return Opportunity(
+        Source='Grants.gov',
+        Title=opp.get('title', 'Unknown'),
+        Agency=opp.get('agencyCode', 'Unknown'),
+        Amount=opp.get('awardCeiling', 'Not specified'),
+        Deadline=opp.get('closeDate', 'Open'),
+        Status=opp.get('oppStatus', 'Unknown'),
+        URL=grants_gov_url(opp.get('id', '')),
+        Relevance=None,
+        Timestamp=run_clock(),
+        Content_Preview=(opp.get('synopsis') or '')[:500] or None
+    )
+
+def watch_list_row(foundation):
+    """Row for a foundation that wasn't scraped this run (no key, or beyond the credit budget)"""
+    return Opportunity(
+        Source='Foundation Watch List',
+        Title=f"{foundation['name']} - Monitor for opportunities",
+        Agency=foundation['name'],
+        Amount='Varies',
+        Deadline='Check website',
+        Status='Watch List',
+        URL=foundation['url'],
+        Relevance='High',
+        Timestamp=run_clock()
+    )
+
+def _grants_gov_page(session, keyword, params):
+    """One Grants.gov search page, retrying 429s and 5xx with Retry-After aware backoff; None on failure"""
+    for attempt in range(MAX_RETRIES + 1):
+        response = session.get(GRANTS_GOV_URL, params=params, timeout=GRANTS_GOV_TIMEOUT)
+        if response.status_code == 200:
+            return response.json()
+        if (response.status_code != 429 and response.status_code < 500) or attempt == MAX_RETRIES:
+            break
+        delay = retry_after_seconds(response, attempt)
+        print(f"  ⏳ Grants.gov {response.status_code} for '{keyword}' - retrying in {delay:.0f}s")
+        time.sleep(delay)
+    print(f"  ⚠️ Grants.gov error {response.status_code} for '{keyword}'")
+    return None
+
+def _keyword_pages(session, keyword, max_records, known_ids=None):
+    """Yield one keyword's hits a page at a time, newest first
+
+    Stops at `max_records`, at the last page, or after a page whose
+    opportunities `known_ids(ids)` reports as all already stored (everything
+    after it is older).
+    """
+    start = 0
+    while start < max_records:
+        rows = min(GRANTS_GOV_PAGE_SIZE, max_records - start)
+        params = {
+            'keyword': keyword,
+            'oppStatuses': 'forecasted|posted',
+            'sortBy': 'openDate|desc',
+            'rows': rows,
+            'startRecordNum': start
+        }
+        data = _grants_gov_page(session, keyword, params)
+        if data is None:
+            return
+        hits = data.get('oppHits', [])
+        if hits:
+            yield hits
+        start += len(hits)
+        if len(hits) < rows or start >= data.get('hitCount', 0):
+            return
+        ids = {str(opp.get('id', '')) for opp in hits}
+        if known_ids is not None and len(known_ids(ids)) == len(ids):
+            return
+
+def iter_grants_gov(keywords=None, max_workers=None, max_records=None, known_ids=None):
+    """Yield Grants.gov hits for every keyword as pages arrive, each opportunity id once
+
+    Keywords are paged concurrently; `known_ids(ids)` returns the subset of
+    ids already stored; a page of only stored ids ends that keyword's paging.
+    """
+    keywords = KEYWORDS if keywords is None else keywords
+    from http_session import get_session
+    max_records = max_records or GRANTS_GOV_MAX_RECORDS
+    session = get_session()
+    pages = queue.Queue()
+    done = object()
+
+    def page_keyword(keyword):
         try:
-            params = {'keyword': keyword, 'oppStatuses': 'forecasted|posted', 'rows': 15}
-            response = requests.get(base_url, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                for opp in data.get('oppHits', []):
-                    results.append({
-                        'Source': 'Grants.gov',
-                        'Title': opp.get('title', 'Unknown'),
-                        'Agency': opp.get('agencyCode', 'Unknown'),
-                        'Amount': opp.get('awardCeiling', 'Not specified'),
-                        'Deadline': opp.get('closeDate', 'Open'),
-                        'Status': opp.get('oppStatus', 'Unknown'),
-                        'URL': f"https://www.grants.gov/search-results-detail/{opp.get('id', '')}",
-                        'Relevance': calculate_relevance(opp.get('title', ''), opp.get('synopsis', '')),
-                        'Deep_Scrape': False,
-                        'Timestamp': datetime.now().isoformat()
-                    })
+            for page in _keyword_pages(session, keyword, max_records, known_ids):
+                pages.put(page)
         except Exception as e:
-            print(f"Error searching Grants.gov: {e}")
-    
-    return results
+            print(f"Error searching Grants.gov for '{keyword}': {e}")
+        finally:
+            pages.put(done)
 
-def scrape_foundation_pages():
-    """Use Firecrawl to scrape foundation grant pages (limit to save credits)"""
-    results = []
-    
-    # Only scrape top 3 foundations to conserve free tier
-    foundations_to_scrape = TARGET_FOUNDATIONS[:3]
+    seen = set()
+    with ThreadPoolExecutor(max_workers=max_workers or GRANTS_GOV_CONCURRENCY) as pool:
+        for keyword in keywords:
+            submit(pool, page_keyword, keyword)
+        remaining = len(keywords)
+        while remaining:
+            page = pages.get()
+            if page is done:
+                remaining -= 1
+                continue
+            for opp in page:
+                opp_id = str(opp.get('id', ''))
+                if opp_id not in seen:
+                    seen.add(opp_id)
+                    yield opp
+
+def search_grants_gov(keywords=None, max_workers=None, max_records=None, known_ids=None):
+    """Report rows for every new Grants.gov opportunity across all keywords (see iter_grants_gov)"""
+    return [_grants_gov_row(opp) for opp in iter_grants_gov(keywords, max_workers, max_records, known_ids)]
+
+def scrape_foundation_pages(client):
+    """Use Firecrawl to scrape foundation grant pages until the run's credit budget is spent
+
+    Cached pages are free, and the stalest pages get the budget first, so
+    coverage rotates through every foundation over the cache TTL. Pages are
+    scored as the batch job hands them back.
+
+    Deadline and Amount come from a schema extraction stored with the page.
+    The extraction (5 credits) is re-run only when a grant-relevant section of
+    the markdown changed since the last successful extraction (the cache keeps
+    such changes pending), so quiet days cost nothing beyond the cheap
+    markdown scrapes; pages never extracted only carry the Has_Deadline /
+    Has_Amount keyword flags.
+    """
+    print(f"\n🔥 Deep scraping foundation pages with Firecrawl (budget: {client.ledger.budget} credits)...")
     
-    print(f"\n🔥 Deep scraping {len(foundations_to_scrape)} foundation pages with Firecrawl...")
+    foundations = client.cache.rotation_order(TARGET_FOUNDATIONS)
+    by_url = {foundation['url']: foundation for foundation in foundations}
+    # Foundations beyond the budget go on the watch list (no scraping to save credits)
+    scheduled = client.affordable(list(by_url))
+    rows = {}
+    to_extract = {}
     
-    for foundation in foundations_to_scrape:
-        print(f"  Scraping {foundation['name']}...")
+    for url, scraped in client.scrape_many(scheduled):
+        if not scraped:
+            continue
+        foundation = by_url[url]
+        print(f"  {'Cached' if scraped.get('cached') else 'Scraped'} {foundation['name']}")
+        markdown = scraped.get('markdown', '')
         
-        scraped = firecrawl_scrape(foundation['url'])
+        # Keyword signals say whether the page lists deadlines or amounts; the values come from extraction
+        signals = PAGE_SIGNAL_MATCHER.scan(markdown)
         
-        if scraped:
-            markdown = scraped.get('markdown', '')
-            
-            # Extract key info from markdown
-            has_deadline = any(word in markdown.lower() for word in ['deadline', 'due date', 'submit by'])
-            has_amount = any(word in markdown.lower() for word in ['$', 'award', 'grant amount', 'funding'])
-            
-            results.append({
-                'Source': 'Firecrawl Deep Scrape',
-                'Title': f"{foundation['name']} - Grant Opportunities",
-                'Agency': foundation['name'],
-                'Amount': 'See page for details' if has_amount else 'Not specified',
-                'Deadline': 'Active deadlines found' if has_deadline else 'Rolling/Unknown',
-                'Status': 'Live Page',
-                'URL': foundation['url'],
-                'Relevance': 'High',
-                'Deep_Scrape': True,
-                'Content_Preview': markdown[:500] if markdown else 'No content',
-                'Timestamp': datetime.now().isoformat()
-            })
-        else:
-            # Fallback - just add the foundation to watch list
-            results.append({
-                'Source': 'Foundation Watch List',
-                'Title': f"{foundation['name']} - Monitor for opportunities",
-                'Agency': foundation['name'],
-                'Amount': 'Varies',
-                'Deadline': 'Check website',
-                'Status': 'Watch List',
-                'URL': foundation['url'],
-                'Relevance': 'High',
-                'Deep_Scrape': False,
-                'Timestamp': datetime.now().isoformat()
-            })
+        rows[url] = Opportunity(
+            Source='Firecrawl Deep Scrape',
+            Title=f"{foundation['name']} - Grant Opportunities",
+            Agency=foundation['name'],
+            Amount=None,
+            Deadline=None,
+            Status='Live Page',
+            URL=url,
+            Relevance='High',
+            Timestamp=scraped.get('fetched_at') or run_clock(),
+            Deep_Scrape=True,
+            Content_Preview=markdown[:500] if markdown else 'No content',
+            Has_Deadline='deadline' in signals,
+            Has_Amount='amount' in signals
+        )
+        
+        changes = client.cache.pending_extract(url)
+        if changes or client.cache.extract(url) is None:
+            to_extract[url] = changes
     
-    # Add remaining foundations as watch list (no scraping to save credits)
-    for foundation in TARGET_FOUNDATIONS[3:]:
-        results.append({
-            'Source': 'Foundation Watch List',
-            'Title': f"{foundation['name']} - Monitor for opportunities",
-            'Agency': foundation['name'],
-            'Amount': 'Varies',
-            'Deadline': 'Check website',
-            'Status': 'Watch List',
-            'URL': foundation['url'],
-            'Relevance': 'High',
-            'Deep_Scrape': False,
-            'Timestamp': datetime.now().isoformat()
-        })
+    # Structured extraction only where grant sections changed since the last one (or nothing is stored yet)
+    for foundation in foundations:
+        url = foundation['url']
+        if url not in to_extract:
+            continue
+        if not client.can_scrape(url, extract=True):
+            print(f"  💳 Extraction budget spent - remaining pages keep their keyword flags")
+            break
+        changes = to_extract[url]
+        print(f"  🔎 Extracting {foundation['name']} ({', '.join(changes[:3]) if changes else 'not extracted yet'})")
+        details = extract_grant_details(url, client)
+        if details:
+            client.cache.set_extract(url, details)
     
+    for url, row in rows.items():
+        details = client.cache.extract(url)
+        if details:
+            rows[url] = row._replace(
+                Deadline=details.get('deadline') or row.Deadline,
+                Amount=grant_amount(details) or row.Amount
+            )
+    
+    # Fallback - foundations not scraped go on the watch list
+    results = [rows.get(foundation['url']) or watch_list_row(foundation) for foundation in foundations]
+    
+    client.cache.save()
+    print(f"  💳 Firecrawl credits used: {client.ledger.spent}/{client.ledger.budget}"
+          f" (extraction: {client.extract_ledger.spent}/{client.extract_ledger.budget})")
     return results
 
 def search_philanthropy_news():
-    """Search philanthropy news RSS (free, no API needed)"""
+    """Search philanthropy news RSS (free, no API needed); only entries not seen before
+
+    Returns (rows, feed state updates to commit once the report is written).
+    """
     results = []
-    feeds = ['https://philanthropynewsdigest.org/news.rss']
+    feeds, feed_updates = fetch_feeds(PHILANTHROPY_FEEDS, limit=15)
     
-    for feed_url in feeds:
-        try:
-            feed = feedparser.parse(feed_url)
-            for entry in feed.entries[:15]:
-                title_lower = entry.title.lower()
-                if any(kw in title_lower for kw in ['digital', 'technology', 'computer', 'education', 'equity', 'grant']):
-                    results.append({
-                        'Source': 'Philanthropy News',
-                        'Title': entry.title,
-                        'Agency': 'Various',
-                        'Amount': 'See article',
-                        'Deadline': 'See article',
-                        'Status': 'News',
-                        'URL': entry.link,
-                        'Relevance': 'Medium',
-                        'Deep_Scrape': False,
-                        'Timestamp': datetime.now().isoformat()
-                    })
-        except Exception as e:
-            print(f"Error parsing feed: {e}")
+    for entries in feeds.values():
+        for entry in entries:
+            if NEWS_TOPIC_MATCHER.scan(entry.title):
+                results.append(Opportunity(
+                    Source='Philanthropy News',
+                    Title=entry.title,
+                    Agency='Various',
+                    Amount='See article',
+                    Deadline='See article',
+                    Status='News',
+                    URL=entry.link,
+                    Relevance='Medium',
+                    Timestamp=run_clock()
+                ))
     
-    return results
+    return results, feed_updates
 
 def calculate_relevance(title, description):
     """Calculate grant relevance to HTI"""
-    combined = f"{title} {description}".lower()
-    score = 0
-    
-    high_value = ['digital equity', 'digital divide', 'computer', 'chromebook', 'laptop', 'device']
-    for kw in high_value:
-        if kw in combined:
-            score += 3
+    hits = RELEVANCE_MATCHER.scan(title, description)
+    score = 3 * len(hits.get('high', ())) + 2 * len(hits.get('medium', ()))
     
-    med_value = ['technology', 'education', 'underserved', 'low-income', 'rural', 'broadband']
-    for kw in med_value:
-        if kw in combined:
-            score += 2
-    
-    if 'north carolina' in combined or ' nc ' in combined:
+    if 'nc' in hits:
         score += 5
     
     if score >= 8:
@@ -239,6 +357,47 @@ def calculate_relevance(title, description):
         return 'Medium'
     return 'Low'
 
+def score_relevance(df):
+    """TF-IDF similarity (0-1) of each row's title and preview to HTI_PROFILE
+
+    All rows are scored in one batch; rows not seen by earlier runs (keyed by
+    URL) are added to the stored IDF statistics first.
+    """
+    ranker = RelevanceRanker(HTI_PROFILE)
+    texts = df['Title'].fillna('') + ' ' + df['Content_Preview'].fillna('')
+    scores = ranker.score(texts.tolist(), keys=df['URL'].tolist())
+    ranker.save()
+    return scores.round(4)
+
+def score_grants(df):
+    """Keyword relevance labels for Grants.gov rows and similarity scores for every row"""
+    grants_gov = df['Source'] == 'Grants.gov'
+    if grants_gov.any():
+        df.loc[grants_gov, 'Relevance'] = calculate_relevance_batch(
+            df.loc[grants_gov, 'Title'], df.loc[grants_gov, 'Content_Preview']
+        )
+    # The report is ordered by similarity score; keyword labels stay as a badge
+    df['Relevance_Score'] = score_relevance(df)
+    return df
+
+def stored_grants(store, fetched_urls):
+    """Stored Grants.gov opportunities this run didn't page back to, first seen within GRANTS_GOV_CARRY_DAYS"""
+    since = datetime.now() - timedelta(days=GRANTS_GOV_CARRY_DAYS)
+    stored = store.stored('grants', GRANTS_GOV_DETAIL_URL, since=since)
+    if stored.empty:
+        return []
+    stored = stored[~stored['URL'].isin(fetched_urls)]
+    return [Opportunity(**{field: record[field] for field in Opportunity._fields if field in record})._replace(Timestamp=run_clock())
+            for record in stored.to_dict('records')]
+
+def calculate_relevance_batch(titles, descriptions):
+    """Vectorized calculate_relevance over pandas Series (for backfills and large pulls)"""
+    import numpy as np
+    import pandas as pd
+    counts = RELEVANCE_MATCHER.category_counts(titles, descriptions)
+    score = 3 * counts['high'] + 2 * counts['medium'] + 5 * (counts['nc'] > 0)
+    return pd.Series(np.select([score >= 8, score >= 4], ['High', 'Medium'], 'Low'), index=titles.index)
+
 def run_collector():
     """Main collector function"""
     print("🔍 HTI Grant Tracker v2 (Firecrawl Enhanced)")
@@ -246,53 +405,75 @@ def run_collector():
     
     all_results = []
     
-    # 1. Grants.gov API (free)
-    print("\n📡 Searching Grants.gov...")
-    all_results.extend(search_grants_gov())
-    
-    # 2. Philanthropy News RSS (free)
-    print("\n📰 Checking philanthropy news...")
-    all_results.extend(search_philanthropy_news())
-    
-    # 3. Foundation pages with Firecrawl (uses credits - limited)
-    if FIRECRAWL_API_KEY:
-        all_results.extend(scrape_foundation_pages())
-    else:
-        print("\n⚠️ Skipping deep scrape - no Firecrawl API key")
-        for foundation in TARGET_FOUNDATIONS:
-            all_results.append({
-                'Source': 'Foundation Watch List',
-                'Title': f"{foundation['name']} - Monitor for opportunities",
-                'Agency': foundation['name'],
-                'Amount': 'Varies',
-                'Deadline': 'Check website',
-                'Status': 'Watch List',
-                'URL': foundation['url'],
-                'Relevance': 'High',
-                'Deep_Scrape': False,
-                'Timestamp': datetime.now().isoformat()
-            })
+    with stage('grants', 'fetch'):
+        # 1. Grants.gov API (free) - paging stops at a page of opportunities stored by earlier
+        #    runs; the older ones it skips are carried forward from the store
+        print("\n📡 Searching Grants.gov...")
+        with HistoryStore() as store:
+            lock = threading.Lock()
+            stopped_early = []
+            def known_ids(ids):
+                with lock:
+                    known = store.has_keys('grants', [grants_gov_url(opp_id) for opp_id in ids])
+                    if len(known) == len(ids):
+                        stopped_early.append(True)
+                    return known
+            grants_gov = search_grants_gov(known_ids=known_ids)
+            all_results.extend(grants_gov)
+            if stopped_early:
+                carried = stored_grants(store, {row.URL for row in grants_gov})
+                print(f"  ↩️ {len(carried)} stored opportunities carried forward")
+                all_results.extend(carried)
+        
+        # 2. Philanthropy News RSS (free)
+        print("\n📰 Checking philanthropy news...")
+        news, feed_updates = search_philanthropy_news()
+        all_results.extend(news)
+        
+        # 3. Foundation pages with Firecrawl (uses credits - budgeted per run)
+        firecrawl = FirecrawlClient(cache=ScrapeCache('foundations', extract_when=grant_section_changes))
+        if firecrawl.enabled:
+            all_results.extend(scrape_foundation_pages(firecrawl))
+        else:
+            print("\n⚠️ Skipping deep scrape - no Firecrawl API key")
+            all_results.extend(watch_list_row(foundation) for foundation in TARGET_FOUNDATIONS)
     
     # Create DataFrame
-    df = pd.DataFrame(all_results)
+    with stage('grants', 'build'):
+        df = records_frame(all_results, Opportunity)
+        if not df.empty:
+            # Keyed by URL: distinct opportunities often share a generic title
+            df = df.drop_duplicates(subset=['URL'])
+            # News stories get re-headlined across outlets; Grants.gov rows have real ids
+            df = collapse_near_duplicates(df, 'grants', 'URL', 'Title', mask=df['Source'] == 'Philanthropy News')
+    
+    # Label and score every row in one vectorized pass
     if not df.empty:
-        df = df.drop_duplicates(subset=['Title', 'Source'])
-        relevance_order = {'High': 0, 'Medium': 1, 'Low': 2}
-        df['_sort'] = df['Relevance'].map(relevance_order)
-        df = df.sort_values('_sort').drop('_sort', axis=1)
+        with stage('grants', 'score'):
+            df = sort_report(apply_schema(score_grants(df), 'grants'), 'grants')
     
     # Save report
-    os.makedirs('reports', exist_ok=True)
-    filename = f"reports/grants-{datetime.now().strftime('%Y-%m-%d')}.csv"
-    df.to_csv(filename, index=False)
+    with stage('grants', 'write'):
+        filename = write_report(df, 'grants')
+    # Only now are this run's news entries safe to treat as seen
+    commit_feed_state(feed_updates)
+    
+    with stage('grants', 'store'), HistoryStore() as store:
+        history = store.upsert('grants', df, REPORT_KEYS['grants'])
     
     # Summary
-    deep_scraped = len(df[df.get('Deep_Scrape', False) == True]) if 'Deep_Scrape' in df.columns else 0
+    deep_scraped = int(df['Deep_Scrape'].sum())
     print(f"\n✅ Saved {len(df)} opportunities to {filename}")
     print(f"   High relevance: {len(df[df['Relevance'] == 'High'])}")
     print(f"   Deep scraped: {deep_scraped}")
+    if 'Deadline' in df.columns:
+        print(f"   Due within {DUE_SOON_DAYS} days: {len(due_within(df, DUE_SOON_DAYS))}")
+    print(f"   New since last run: {history['new']} (changed: {history['changed']})")
     
     return df
 
 if __name__ == '__main__':
+    if '--check' in sys.argv:
+        from config_check import run_check
+        sys.exit(run_check(['grants']))
     run_collector()
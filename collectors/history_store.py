@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HTI History Store
+Embedded SQLite store every collector upserts its report rows into, keyed by a
+stable id (opportunity URL, post id, ...), so the digest can ask for only what
+is new or changed since the last run instead of re-reading every day's CSV.
+"""
+import hashlib
+import json
+import sqlite3
+from datetime import datetime
+from state import state_path
+
+HISTORY_DB = 'history.sqlite'
+
+# Stable key column of each report kind
+REPORT_KEYS = {
+    'grants': 'URL',
+    'digital-divide': 'Post_ID',
+    'partners': 'URL',
+    'competitors': 'URL'
+}
+
+# Columns that change on every run without the item itself changing (relevance scores move with the IDF)
+VOLATILE_COLUMNS = ('Timestamp', 'Last_Scraped', 'Relevance_Score')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    first_run INTEGER NOT NULL,
+    changed_run INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_items_first_seen ON items (kind, first_seen);
+CREATE INDEX IF NOT EXISTS idx_items_changed_run ON items (kind, changed_run);
+CREATE INDEX IF NOT EXISTS idx_runs_kind ON runs (kind, run_id);
+'''
+
+UPSERT = '''
+INSERT INTO items (kind, key, first_seen, last_seen, first_run, changed_run, last_run, content_hash, position, payload)
+VALUES (:kind, :key, :now, :now, :run_id, :run_id, :run_id, :hash, :position, :payload)
+ON CONFLICT (kind, key) DO UPDATE SET
+    last_seen = excluded.last_seen,
+    last_run = excluded.last_run,
+    changed_run = CASE WHEN items.content_hash != excluded.content_hash
+                       THEN excluded.changed_run ELSE items.changed_run END,
+    content_hash = excluded.content_hash,
+    position = excluded.position,
+    payload = excluded.payload
+'''
+
+def row_hash(record, volatile=VOLATILE_COLUMNS):
+    """Hash of a row's content, ignoring per-run columns"""
+    stable = {k: v for k, v in record.items() if k not in volatile}
+    return hashlib.sha1(json.dumps(stable, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class HistoryStore:
+    """Upsert report rows by key; query what is new or changed since the last run"""
+
+    def __init__(self, path=None):
+        self.path = path or state_path(HISTORY_DB)
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(items)')}
+        if 'position' not in columns:
+            self.conn.execute('ALTER TABLE items ADD COLUMN position INTEGER NOT NULL DEFAULT 0')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_run(self, kind):
+        """Register a run; rows upserted under it count as that run's changes"""
+        with self.conn:
+            cursor = self.conn.execute(
+                'INSERT INTO runs (kind, started_at) VALUES (?, ?)', (kind, datetime.now().isoformat())
+            )
+        return cursor.lastrowid
+
+    def last_run(self, kind):
+        row = self.conn.execute('SELECT MAX(run_id) FROM runs WHERE kind = ?', (kind,)).fetchone()
+        return row[0]
+
+    def upsert(self, kind, df, key_column, run_id=None):
+        """Upsert a report DataFrame; returns {'new': n, 'changed': n, 'unchanged': n}"""
+        run_id = run_id or self.start_run(kind)
+        now = datetime.now().isoformat()
+        records = df.to_dict('records') if not df.empty else []
+        keys = [str(record[key_column]) for record in records]
+        hashes = [row_hash(record) for record in records]
+
+        known = self.known_hashes(kind, keys)
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        for key, digest in zip(keys, hashes):
+            if key not in known:
+                counts['new'] += 1
+            elif known[key] != digest:
+                counts['changed'] += 1
+            else:
+                counts['unchanged'] += 1
+
+        with self.conn:
+            self.conn.executemany(UPSERT, [
+                {'kind': kind, 'key': key, 'now': now, 'run_id': run_id, 'hash': digest,
+                 'position': position, 'payload': json.dumps(record, default=str)}
+                for position, (key, digest, record) in enumerate(zip(keys, hashes, records))
+            ])
+        return counts
+
+    def known_hashes(self, kind, keys):
+        """{key: content_hash} for the given keys already in the store"""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(self.conn.execute(
+                f'SELECT key, content_hash FROM items WHERE kind = ? AND key IN ({placeholders})',
+                [kind, *chunk]
+            ).fetchall())
+        return found
+
+    def has_keys(self, kind, keys):
+        """Subset of keys already stored"""
+        return set(self.known_hashes(kind, keys))
+
+    def changed_keys_since_last_run(self, kind):
+        """Keys first seen or changed in the latest run of `kind` (None if it never ran)"""
+        run_id = self.last_run(kind)
+        if run_id is None:
+            return None
+        rows = self.conn.execute(
+            'SELECT key FROM items WHERE kind = ? AND changed_run = ?', (kind, run_id)
+        ).fetchall()
+        return {key for (key,) in rows}
+
+    def stored(self, kind, key_prefix='', since=''):
+        """Stored rows of `kind` whose key starts with `key_prefix`, first seen on or after `since`, oldest first"""
+        since = since.isoformat() if hasattr(since, 'isoformat') else since
+        rows = self.conn.execute(
+            'SELECT payload FROM items WHERE kind = ? AND substr(key, 1, ?) = ? AND first_seen >= ? ORDER BY first_seen',
+            (kind, len(key_prefix), key_prefix, since)
+        ).fetchall()
+        return self._frame(rows)
+
+    def new_since(self, kind, since):
+        """Rows first seen on or after `since` (ISO date or datetime)"""
+        since = since.isoformat() if hasattr(since, 'isoformat') else since
+        rows = self.conn.execute(
+            'SELECT payload FROM items WHERE kind = ? AND first_seen >= ? ORDER BY first_seen',
+            (kind, since)
+        ).fetchall()
+        return self._frame(rows)
+
+    @staticmethod
+    def _frame(rows):
+        import pandas as pd
+        return pd.DataFrame([json.loads(payload) for (payload,) in rows])
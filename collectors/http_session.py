@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+HTI Shared HTTP Session
+One pooled keep-alive requests.Session shared by every collector in a process.
+Its adapter records every request in the run metrics (calls, bytes, 429s, timeouts).
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config_check import env_number
+from metrics import record_http
+
+USER_AGENT = 'HTIAutomator/1.0'
+POOL_SIZE = env_number('HTI_HTTP_POOL_SIZE', 16)
+
+_session = None
+_lock = threading.Lock()
+
+class MeteredAdapter(HTTPAdapter):
+    """HTTPAdapter that records each request against the current metrics stage"""
+
+    def send(self, request, **kwargs):
+        source = urlsplit(request.url).netloc
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.Timeout:
+            record_http(source, time.perf_counter() - start, timeout=True)
+            raise
+        except requests.RequestException:
+            record_http(source, time.perf_counter() - start, error=True)
+            raise
+        # Read the body here (requests would right after) so its download time and size count
+        nbytes = int(response.headers.get('Content-Length') or 0) if kwargs.get('stream') else len(response.content)
+        record_http(source, time.perf_counter() - start, nbytes, response.status_code)
+        return response
+
+def new_session(pool_size=POOL_SIZE):
+    """Pooled, metered session (for clients that must not share the process-wide one)"""
+    session = requests.Session()
+    adapter = MeteredAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def get_session():
+    """Return the process-wide pooled session (created on first use)"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = new_session()
+    return _session
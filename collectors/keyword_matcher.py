@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+HTI Keyword Matcher
+Compiles a {category: [keywords]} table into one case-insensitive alternation
+regex so every category hit is found in a single pass over the text.
+
+Keywords match on word boundaries ('nc' no longer matches inside "since") and
+accept simple inflections (-s, -es, -ed, -ing), so 'expand' still matches
+"expanded" and 'laptop' matches "laptops". Keywords that start or end with a
+non-word character (e.g. '$') are only bounded on their word-character side.
+
+For batch scoring, `category_counts` builds a NumPy rows x keywords hit
+matrix from whole pandas columns (one vectorized `str.contains` per keyword,
+run by Arrow's regex kernel when pyarrow is installed) and gives the same
+counts as `scan`.
+"""
+import re
+
+SUFFIXES = r'(?:s|es|ed|ing)?'
+
+def _keyword_pattern(keyword):
+    """Regex for one keyword with boundaries only where the keyword has word characters"""
+    body = re.escape(keyword)
+    if keyword[:1].isalnum() or keyword[:1] == '_':
+        body = r'\b' + body
+    if keyword[-1:].isalnum() or keyword[-1:] == '_':
+        body = body + SUFFIXES + r'\b'
+    return body
+
+class KeywordMatcher:
+    """One compiled pattern for a whole keyword table"""
+
+    def __init__(self, table):
+        self.table = {category: list(keywords) for category, keywords in table.items()}
+        self.keywords = sorted({kw.lower() for kws in self.table.values() for kw in kws}, key=len, reverse=True)
+        self.categories_of = {kw: set() for kw in self.keywords}
+        for category, keywords in self.table.items():
+            for kw in keywords:
+                self.categories_of[kw.lower()].add(category)
+
+        self.group_keyword = {f'k{i}': kw for i, kw in enumerate(self.keywords)}
+
+    def _compiled(self):
+        """(pattern, implied keywords), compiled on first scan so importing a collector stays cheap"""
+        if not hasattr(self, '_compiled_pattern'):
+            # Longest keywords first so 'digital divide' wins over any shorter overlap
+            pattern = re.compile(
+                '|'.join(f'(?P<k{i}>{_keyword_pattern(kw)})' for i, kw in enumerate(self.keywords)),
+                re.IGNORECASE
+            )
+
+            # A match consumes its span, so record the shorter keywords each keyword contains
+            # ('single parent' also counts as 'parent')
+            singles = {kw: re.compile(_keyword_pattern(kw), re.IGNORECASE) for kw in self.keywords}
+            implied = {
+                kw: {other for other in self.keywords if other != kw and singles[other].search(kw)}
+                for kw in self.keywords
+            }
+            self._compiled_pattern = (pattern, implied)
+        return self._compiled_pattern
+
+    @property
+    def pattern(self):
+        return self._compiled()[0]
+
+    @property
+    def implied(self):
+        return self._compiled()[1]
+
+    def keywords_in(self, *texts):
+        """Set of (lowercased) keywords present in the texts"""
+        pattern, implied = self._compiled()
+        found = set()
+        for text in texts:
+            if not text:
+                continue
+            for match in pattern.finditer(text):
+                kw = self.group_keyword[match.lastgroup]
+                found.add(kw)
+                found |= implied[kw]
+        return found
+
+    def scan(self, *texts):
+        """{category: set of keywords hit} for every category with at least one hit"""
+        hits = {}
+        for kw in self.keywords_in(*texts):
+            for category in self.categories_of[kw]:
+                hits.setdefault(category, set()).add(kw)
+        return hits
+
+    def first_category(self, *texts, default=None):
+        """First category in table order with a hit (for if/elif style classifiers)"""
+        hits = self.scan(*texts)
+        for category in self.table:
+            if category in hits:
+                return category
+        return default
+
+    def _membership(self):
+        """Keywords x categories 0/1 matrix (built on first batch call)"""
+        if not hasattr(self, '_membership_matrix'):
+            import numpy as np
+
+            self._membership_matrix = np.array(
+                [[category in self.categories_of[kw] for category in self.table] for kw in self.keywords],
+                dtype=np.int32
+            ).reshape(len(self.keywords), len(self.table))
+        return self._membership_matrix
+
+    def hit_matrix(self, *columns):
+        """Rows x keywords boolean NumPy matrix for one or more aligned pandas string Series"""
+        import numpy as np
+
+        hits = np.zeros((len(columns[0]), len(self.keywords)), dtype=bool)
+        for column in columns:
+            text = column.fillna('').astype(str)
+            try:
+                text = text.astype('string[pyarrow]')
+            except ImportError:
+                pass
+            for i, kw in enumerate(self.keywords):
+                hits[:, i] |= text.str.contains(_keyword_pattern(kw), case=False, regex=True).to_numpy(dtype=bool)
+        return hits
+
+    def category_counts(self, *columns):
+        """DataFrame of distinct-keyword hit counts per category, indexed like the first column"""
+        import numpy as np
+        import pandas as pd
+
+        counts = self.hit_matrix(*columns).astype(np.int32) @ self._membership()
+        return pd.DataFrame(counts, index=columns[0].index, columns=list(self.table))
+
+    def first_category_batch(self, *columns, default=None):
+        """Vectorized `first_category` over aligned pandas string Series"""
+        import numpy as np
+        import pandas as pd
+
+        counts = self.category_counts(*columns)
+        labels = np.select([counts[c].to_numpy() > 0 for c in self.table], list(self.table), default)
+        return pd.Series(labels, index=columns[0].index)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+HTI Run Metrics
+Counters recorded during a pipeline run, labelled by collector (kind), stage
+and source host: stage wall time, HTTP calls, bytes downloaded, 429s,
+timeouts, Firecrawl credits and report rows. Collectors mark their stages
+with `stage(kind, name)`; HTTP calls made inside a stage are attributed to it
+by the shared session's adapter. run_all writes everything to
+reports/metrics-<date>.json and .prom (Prometheus text format).
+
+Profiling is opt-in with HTI_PROFILE (comma-separated):
+    cpu     cProfile each collector, one at a time -> reports/profile-<kind>-<date>.prof
+    memory  tracemalloc over the run -> reports/memory-<date>.txt + peak metric
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE = {p.strip() for p in os.getenv('HTI_PROFILE', '').split(',') if p.strip()}
+TRACEMALLOC_TOP = 25
+
+# Metric name -> (Prometheus type, help text)
+METRICS = {
+    'stage_seconds': ('gauge', 'Wall time of a collector stage'),
+    'http_requests': ('counter', 'HTTP requests sent'),
+    'http_bytes': ('counter', 'Response bytes downloaded'),
+    'http_seconds': ('counter', 'Time spent waiting on HTTP requests'),
+    'http_rate_limited': ('counter', 'HTTP 429 responses'),
+    'http_server_errors': ('counter', 'HTTP 5xx responses'),
+    'http_timeouts': ('counter', 'HTTP requests that timed out'),
+    'http_errors': ('counter', 'HTTP requests that failed without a response'),
+    'firecrawl_credits': ('counter', 'Firecrawl credits spent'),
+    'firecrawl_cache_hits': ('counter', 'Firecrawl scrapes served from the scrape cache'),
+    'rows': ('gauge', 'Report rows produced'),
+    'peak_memory_bytes': ('gauge', 'Peak memory traced by tracemalloc')
+}
+
+# (kind, stage) of the code currently running; copied into worker threads by `submit`
+_current = contextvars.ContextVar('hti_stage', default=('', ''))
+_values = {}
+_lock = threading.Lock()
+# One cProfile profiler at a time (see profiled)
+_profile_lock = threading.Lock()
+
+def add(name, value=1, kind=None, stage=None, source=''):
+    """Add `value` to a counter; kind and stage default to the enclosing `stage` block"""
+    current_kind, current_stage = _current.get()
+    key = (name, current_kind if kind is None else kind, current_stage if stage is None else stage, source)
+    with _lock:
+        _values[key] = _values.get(key, 0) + value
+
+@contextmanager
+def stage(kind, name):
+    """Time the block as `kind`'s `name` stage and attribute counters inside it to that stage"""
+    token = _current.set((kind, name))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add('stage_seconds', time.perf_counter() - start, kind, name)
+        _current.reset(token)
+
+def submit(pool, fn, *args, **kwargs):
+    """pool.submit that keeps the caller's stage, so work done in the pool is attributed to it"""
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def record_http(source, elapsed, nbytes=0, status=None, timeout=False, error=False):
+    """Record one HTTP request to `source` (host) under the current stage"""
+    add('http_requests', 1, source=source)
+    add('http_seconds', elapsed, source=source)
+    if nbytes:
+        add('http_bytes', nbytes, source=source)
+    if status == 429:
+        add('http_rate_limited', 1, source=source)
+    elif status is not None and status >= 500:
+        add('http_server_errors', 1, source=source)
+    if timeout:
+        add('http_timeouts', 1, source=source)
+    elif error:
+        add('http_errors', 1, source=source)
+
+def samples():
+    """[{'metric', 'kind', 'stage', 'source', 'value'}] for every counter recorded so far"""
+    with _lock:
+        items = sorted(_values.items())
+    return [
+        {'metric': name, 'kind': kind, 'stage': stage_name, 'source': source, 'value': value}
+        for (name, kind, stage_name, source), value in items
+    ]
+
+def stage_timings(kind=None):
+    """{kind: {stage: seconds}} recorded so far, or one kind's {stage: seconds}"""
+    timings = {}
+    for sample in samples():
+        if sample['metric'] == 'stage_seconds':
+            timings.setdefault(sample['kind'], {})[sample['stage']] = sample['value']
+    return timings.get(kind, {}) if kind is not None else timings
+
+def summary():
+    """Per-kind totals: seconds, HTTP calls, bytes, 429s, timeouts, credits, rows"""
+    totals = {}
+    for sample in samples():
+        if sample['kind'] and sample['metric'] != 'stage_seconds':
+            kind = totals.setdefault(sample['kind'], {})
+            kind[sample['metric']] = kind.get(sample['metric'], 0) + sample['value']
+    # 'total' wraps a whole collector run; without it, add up the stages
+    for kind, stages in stage_timings().items():
+        totals.setdefault(kind, {})['seconds'] = stages.get('total', sum(stages.values()))
+    return totals
+
+def reset_metrics():
+    with _lock:
+        _values.clear()
+
+def _prometheus_labels(sample):
+    labels = [f'{label}="{sample[label]}"' for label in ('kind', 'stage', 'source') if sample[label]]
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+def prometheus_text():
+    """Every counter in the Prometheus text exposition format"""
+    lines = []
+    by_metric = {}
+    for sample in samples():
+        by_metric.setdefault(sample['metric'], []).append(sample)
+    for name, metric_samples in by_metric.items():
+        kind, help_text = METRICS.get(name, ('gauge', name))
+        metric = f"hti_{name}{'_total' if kind == 'counter' else ''}"
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        lines.extend(f'{metric}{_prometheus_labels(sample)} {sample["value"]:g}' for sample in metric_samples)
+    return '\n'.join(lines) + '\n'
+
+def write_metrics(started_at=None, directory=None, date=None):
+    """Write reports/metrics-<date>.json and .prom; returns the JSON path"""
+    from report_io import REPORTS_DIR
+    directory = directory or REPORTS_DIR
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.join(directory, f"metrics-{(date or datetime.now()).strftime('%Y-%m-%d')}")
+
+    with open(f'{stem}.json', 'w') as f:
+        json.dump({
+            'started_at': started_at.isoformat() if started_at else None,
+            'finished_at': datetime.now().isoformat(),
+            'summary': summary(),
+            'samples': samples()
+        }, f, indent=2)
+    with open(f'{stem}.prom', 'w') as f:
+        f.write(prometheus_text())
+    return f'{stem}.json'
+
+def _profile_path(name, extension):
+    from report_io import REPORTS_DIR
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    return os.path.join(REPORTS_DIR, f"{name}-{datetime.now().strftime('%Y-%m-%d')}.{extension}")
+
+@contextmanager
+def profiled(kind):
+    """cProfile the block when HTI_PROFILE includes cpu
+
+    Only one profiler may be active per process (Python 3.12+ refuses a
+    second), so blocks in concurrent threads take turns.
+    """
+    if 'cpu' not in PROFILE:
+        yield
+        return
+
+    import cProfile
+    with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(_profile_path(f'profile-{kind}', 'prof'))
+
+@contextmanager
+def traced_memory():
+    """tracemalloc the block when HTI_PROFILE includes memory; records the peak and top allocation sites"""
+    if 'memory' not in PROFILE:
+        yield
+        return
+
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        add('peak_memory_bytes', peak, kind='pipeline', stage='')
+        with open(_profile_path('memory', 'txt'), 'w') as f:
+            f.write(f'Peak traced memory: {peak / 1e6:.1f} MB\n\n')
+            for statistic in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                f.write(f'{statistic}\n')
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+HTI Mock API Server
+Local stand-in for the paid/limited APIs the pipeline calls, for load tests
+that must not burn real quotas. Serves recorded payloads from
+collectors/fixtures/ with configurable latency, 429 bursts, timeouts, server
+errors and payload sizes.
+
+    python collectors/mock_server.py --latency 0.2 --burst-every 20 --burst-size 5 --timeout-rate 0.02
+
+then point the pipeline at it (printed on start):
+
+    FIRECRAWL_URL=http://127.0.0.1:8765/v1
+    GRANTS_GOV_URL=http://127.0.0.1:8765/grantsws/rest/opportunities/search
+    MANUS_API_BASE=http://127.0.0.1:8765/v1
+    RESEND_API_URL=http://127.0.0.1:8765/emails
+
+Endpoints:
+    POST /v1/scrape                              Firecrawl scrape (with the recorded extraction when asked for)
+    POST /v1/batch/scrape, GET /v1/batch/scrape/<id>
+                                                 Firecrawl batch scrape (a page finishes every --batch-page-seconds)
+    GET  /grantsws/rest/opportunities/search     Grants.gov search
+    POST /v1/tasks, GET /v1/tasks/<id>           Manus tasks (complete after --task-seconds)
+    POST /emails                                 Resend
+    GET  /_stats                                 request counts by route and status
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+DEFAULT_PORT = 8765
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return json.loads(f.read())
+
+class MockState:
+    """Payloads, fault settings and counters shared by every handler thread"""
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.stats = {}
+        self.tasks = {}
+        self.batches = {}
+
+        grants = load_fixture('grants_gov_search.json')
+        hits = grants['oppHits']
+        grants['oppHits'] = [
+            dict(hits[i % len(hits)], id=f"{hits[i % len(hits)]['id']}{i // len(hits):03d}") if i >= len(hits) else hits[i]
+            for i in range(config.grants_hits)
+        ]
+        grants['hitCount'] = len(grants['oppHits'])
+        self.grants = grants
+
+        scrape = load_fixture('firecrawl_scrape.json')
+        markdown = scrape['data']['markdown']
+        if config.markdown_kb:
+            target = config.markdown_kb * 1024
+            markdown = (markdown * (target // len(markdown) + 1))[:target]
+        scrape['data']['markdown'] = markdown
+        self.scrape = json.dumps(scrape).encode('utf-8')
+        self.page = scrape['data']
+        scrape['data'] = dict(scrape['data'], **load_fixture('firecrawl_extract.json')['data'])
+        self.extract = json.dumps(scrape).encode('utf-8')
+
+        self.email = json.dumps(load_fixture('resend_email.json')).encode('utf-8')
+
+    def next_request(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+    def count(self, route, status):
+        with self.lock:
+            by_status = self.stats.setdefault(route, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+
+    def chance(self, rate):
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = 'HTIMock/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    # (method, path pattern, handler name)
+    ROUTES = [
+        ('POST', re.compile(r'^/v1/scrape$'), 'firecrawl_scrape'),
+        ('POST', re.compile(r'^/v1/batch/scrape$'), 'firecrawl_batch'),
+        ('GET', re.compile(r'^/v1/batch/scrape/(?P<job_id>[\w-]+)$'), 'firecrawl_batch_status'),
+        ('GET', re.compile(r'^/grantsws/rest/opportunities/search$'), 'grants_gov_search'),
+        ('POST', re.compile(r'^/v1/tasks$'), 'manus_create_task'),
+        ('GET', re.compile(r'^/v1/tasks/(?P<task_id>[\w-]+)$'), 'manus_task_status'),
+        ('POST', re.compile(r'^/emails$'), 'resend_email'),
+        ('GET', re.compile(r'^/_stats$'), 'stats')
+    ]
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if not self.state.config.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        for route_method, pattern, name in self.ROUTES:
+            match = pattern.match(url.path)
+            if match and route_method == method:
+                if name != 'stats' and self.inject_fault(name):
+                    return
+                status, payload = getattr(self, name)(parse_qs(url.query), body, **match.groupdict())
+                self.respond(name, status, payload)
+                return
+        self.respond('unknown', 404, b'{"error": "no such endpoint"}')
+
+    def respond(self, route, status, payload, headers=None):
+        self.state.count(route, status)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def inject_fault(self, route):
+        """Apply latency and maybe answer with a fault; True if the request was answered"""
+        config = self.state.config
+        number = self.state.next_request()
+
+        if config.latency or config.jitter:
+            time.sleep(config.latency + self.state.random.uniform(0, config.jitter))
+
+        # Deterministic bursts: the first `burst_size` of every `burst_every` requests are throttled
+        burst = config.burst_every and (number - 1) % config.burst_every < config.burst_size
+        if burst or self.state.chance(config.rate_limit):
+            self.respond(route, 429, b'{"error": "rate limited"}', {'Retry-After': str(config.retry_after)})
+            return True
+        if self.state.chance(config.timeout_rate):
+            # Longer than the client timeouts (30s), so the caller sees a read timeout
+            time.sleep(config.hang)
+            self.respond(route, 504, b'{"error": "gateway timeout"}')
+            return True
+        if self.state.chance(config.error_rate):
+            self.respond(route, 503, b'{"error": "unavailable"}')
+            return True
+        return False
+
+    def firecrawl_scrape(self, query, body):
+        if 'extract' in json.loads(body or b'{}').get('formats', []):
+            return 200, self.state.extract
+        return 200, self.state.scrape
+
+    def firecrawl_batch(self, query, body):
+        if self.state.config.no_batch:
+            return 404, b'{"error": "batch scrape not available"}'
+        job_id = uuid.uuid4().hex[:12]
+        with self.state.lock:
+            self.state.batches[job_id] = {'created': time.monotonic(), 'urls': json.loads(body)['urls']}
+        return 200, json.dumps({'success': True, 'id': job_id}).encode('utf-8')
+
+    def firecrawl_batch_status(self, query, body, job_id):
+        with self.state.lock:
+            job = self.state.batches.get(job_id)
+        if job is None:
+            return 404, b'{"error": "unknown job"}'
+        elapsed = time.monotonic() - job['created']
+        page_seconds = self.state.config.batch_page_seconds
+        done = len(job['urls']) if page_seconds <= 0 else min(len(job['urls']), int(elapsed / page_seconds))
+        data = [
+            dict(self.state.page, metadata=dict(self.state.page['metadata'], sourceURL=url))
+            for url in job['urls'][:done]
+        ]
+        return 200, json.dumps({
+            'status': 'completed' if done == len(job['urls']) else 'scraping',
+            'total': len(job['urls']),
+            'completed': done,
+            'creditsUsed': done,
+            'data': data
+        }).encode('utf-8')
+
+    def grants_gov_search(self, query, body):
+        start = int(query.get('startRecordNum', ['0'])[0])
+        rows = int(query.get('rows', ['15'])[0])
+        grants = self.state.grants
+        page = dict(grants, startRecord=start, oppHits=grants['oppHits'][start:start + rows])
+        return 200, json.dumps(page).encode('utf-8')
+
+    def manus_create_task(self, query, body):
+        task_id = uuid.uuid4().hex[:12]
+        request = json.loads(body or b'{}')
+        with self.state.lock:
+            self.state.tasks[task_id] = {'created': time.monotonic(), 'name': request.get('name', '')}
+        return 200, json.dumps({'task_id': task_id}).encode('utf-8')
+
+    def manus_task_status(self, query, body, task_id):
+        with self.state.lock:
+            task = self.state.tasks.get(task_id)
+        if task is None:
+            return 404, b'{"error": "unknown task"}'
+        if time.monotonic() - task['created'] < self.state.config.task_seconds:
+            return 200, json.dumps({'task_id': task_id, 'status': 'running'}).encode('utf-8')
+        return 200, json.dumps({
+            'task_id': task_id,
+            'status': 'completed',
+            'outputs': [{'type': 'file', 'name': 'report.md', 'url': f'https://example.invalid/{task_id}/report.md'}],
+            'result': f"Mock result for {task['name']}"
+        }).encode('utf-8')
+
+    def resend_email(self, query, body):
+        return 200, self.state.email
+
+    def stats(self, query, body):
+        with self.state.lock:
+            return 200, json.dumps({'requests': self.state.requests, 'routes': self.state.stats}).encode('utf-8')
+
+def make_server(config):
+    server = ThreadingHTTPServer((config.host, config.port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(config)
+    return server
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local mock of Firecrawl, Grants.gov, Manus and Resend')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency, up to this many seconds')
+    parser.add_argument('--burst-every', type=int, default=0, help='start a 429 burst every N requests')
+    parser.add_argument('--burst-size', type=int, default=0, help='requests throttled per burst')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='probability of a random 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='probability of hanging for --hang seconds')
+    parser.add_argument('--hang', type=float, default=35.0, help='seconds a timed-out request hangs')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability of a 503')
+    parser.add_argument('--grants-hits', type=int, default=15, help='opportunities matching each Grants.gov search (paged)')
+    parser.add_argument('--markdown-kb', type=int, default=0, help='Firecrawl markdown size (default: recorded page)')
+    parser.add_argument('--batch-page-seconds', type=float, default=0.5, help='seconds per finished batch-scrape page')
+    parser.add_argument('--no-batch', action='store_true', help='answer batch-scrape submissions with 404')
+    parser.add_argument('--task-seconds', type=float, default=5.0, help='seconds until a Manus task completes')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for reproducible fault patterns')
+    parser.add_argument('--quiet', action='store_true', help='no per-request log lines')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    config = parse_args()
+    server = make_server(config)
+    base = f'http://{config.host}:{server.server_address[1]}'
+    print(f"🧪 HTI mock APIs on {base}")
+    print(f"   FIRECRAWL_URL={base}/v1")
+    print(f"   GRANTS_GOV_URL={base}/grantsws/rest/opportunities/search")
+    print(f"   MANUS_API_BASE={base}/v1")
+    print(f"   RESEND_API_URL={base}/emails")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopping mock server")
+    finally:
+        server.server_close()
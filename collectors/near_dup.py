@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+HTI Near-Duplicate Index
+MinHash signatures of title + summary words, stored between runs in SQLite
+with LSH banding: each signature is cut into bands and every band is an
+indexed bucket, so a lookup only compares against items sharing a bucket
+instead of the whole history. Shared by partner_monitor, grant_tracker and
+reddit_digital_divide, so the same story carried by Google News and
+Philanthropy News Digest under slightly different headlines collapses to one row.
+
+MinHash rather than SimHash: headlines are too short for SimHash bit distances
+to separate re-headlined copies from unrelated stories. Bands and rows are
+chosen so the LSH cutoff, (1/BANDS)^(1/ROWS_PER_BAND), sits at
+SIMILARITY_THRESHOLD: pairs well below it rarely share a bucket. Signatures
+are numpy uint64 arrays stored as blobs, and a batch of rows is matched
+against the index with one query.
+
+Signatures expire after their collector's report window (WINDOW_DAYS by
+default), so the index stays the size of a few reports' worth of items.
+"""
+import hashlib
+import random
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from functools import lru_cache
+from state import state_path
+
+NEAR_DUP_DB = 'near-dup.sqlite'
+SIMILARITY_THRESHOLD = 0.5  # estimated Jaccard similarity of word sets
+BANDS = 16
+ROWS_PER_BAND = 4  # (1/16)^(1/4) = 0.5, the similarity threshold
+NUM_PERM = BANDS * ROWS_PER_BAND
+MIN_TOKENS = 3
+WINDOW_DAYS = 30  # how long a kept item suppresses later near-duplicates
+
+# Permutations are h -> a*h + b mod 2^64 with odd a; minima compare the well-mixed high bits
+_rng = random.Random(83315329)
+_PERM_A = [_rng.getrandbits(64) | 1 for _ in range(NUM_PERM)]
+_PERM_B = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+_BAND_MIX = [_rng.getrandbits(64) | 1 for _ in range(ROWS_PER_BAND)]
+
+WORD = re.compile(r"[a-z0-9']+")
+STOPWORDS = {
+    'a', 'an', 'and', 'the', 'of', 'to', 'in', 'for', 'on', 'at', 'by', 'with', 'from',
+    'is', 'are', 'was', 'be', 'as', 'its', 'it', 'this', 'that', 'new', 'after', 'about'
+}
+# Google News style " - Publisher" suffix on headlines
+PUBLISHER_SUFFIX = re.compile(r'\s+[-|–]\s+[^-|–]{1,60}$')
+
+# Bumped when stored signatures or buckets stop being comparable; older indexes are rebuilt
+# (2: 64 multiply-add permutations in 16 bands of 4, stored as blobs; buckets keyed by band/bucket/key)
+INDEX_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS signatures (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    added_at TEXT
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, key)
+) WITHOUT ROWID;
+'''
+
+
+def near_dup_text(title, summary=''):
+    """Text used for fingerprinting: headline without publisher suffix plus summary"""
+    return f"{PUBLISHER_SUFFIX.sub('', str(title or ''))} {summary or ''}"
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+@lru_cache(maxsize=None)
+def _constants():
+    """Permutation and band-mixing multipliers as uint64 arrays"""
+    import numpy as np
+    return tuple(np.array(values, dtype=np.uint64) for values in (_PERM_A, _PERM_B, _BAND_MIX))
+
+def minhash(text):
+    """MinHash signature (uint64 array) of the text's word set, or None if too short to compare reliably"""
+    import numpy as np
+
+    tokens = {w for w in WORD.findall(text.lower()) if w not in STOPWORDS}
+    if len(tokens) < MIN_TOKENS:
+        return None
+    perm_a, perm_b, _ = _constants()
+    hashes = np.array([_token_hash(t) for t in tokens], dtype=np.uint64)
+    # uint64 arithmetic wraps, which is the mod 2^64
+    return (hashes[:, None] * perm_a + perm_b).min(axis=0)
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    import numpy as np
+    return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+
+def band_buckets(signatures):
+    """(n, BANDS) signed 63-bit hashes of each signature's bands, for an (n, NUM_PERM) array"""
+    import numpy as np
+
+    _, _, band_mix = _constants()
+    bands = np.asarray(signatures, dtype=np.uint64).reshape(-1, BANDS, ROWS_PER_BAND)
+    return ((bands * band_mix).sum(axis=2, dtype=np.uint64) >> np.uint64(1)).astype(np.int64)
+
+def _signature(blob):
+    import numpy as np
+    return np.frombuffer(blob, dtype='<u8')
+
+class NearDupIndex:
+    """Persistent MinHash LSH index"""
+
+    def __init__(self, path=None, threshold=SIMILARITY_THRESHOLD):
+        self.path = path or state_path(NEAR_DUP_DB)
+        self.threshold = threshold
+        self.conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != INDEX_VERSION:
+            # Older signatures can't be compared with these; the index refills within a report window
+            with self.conn:
+                self.conn.execute('DROP TABLE IF EXISTS signatures')
+                self.conn.execute('DROP TABLE IF EXISTS buckets')
+                self.conn.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+        self.conn.executescript(SCHEMA)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_signatures_age ON signatures (kind, added_at)')
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def representative(self, signature, key=None):
+        """Key of a stored near-duplicate other than `key` itself, or None"""
+        return self.representatives([signature], [key])[0]
+
+    def representatives(self, signatures, keys):
+        """Key of a stored near-duplicate for each signature (other than its own key), or None
+
+        Every signature's buckets are probed in one query.
+        """
+        import numpy as np
+
+        signatures = np.asarray(signatures, dtype=np.uint64).reshape(-1, NUM_PERM)
+        buckets = band_buckets(signatures)
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS probes (item INTEGER, band INTEGER, bucket INTEGER)')
+        self.conn.executemany('INSERT INTO probes VALUES (?, ?, ?)', zip(
+            np.repeat(np.arange(len(buckets)), BANDS).tolist(),
+            np.tile(np.arange(BANDS), len(buckets)).tolist(),
+            buckets.ravel().tolist()
+        ))
+        candidates = self.conn.execute(
+            'SELECT DISTINCT p.item, s.key, s.signature FROM probes p '
+            'JOIN buckets b ON b.band = p.band AND b.bucket = p.bucket JOIN signatures s ON s.key = b.key'
+        ).fetchall()
+        self.conn.execute('DELETE FROM probes')
+
+        found = [None] * len(signatures)
+        for item, other_key, other_signature in candidates:
+            if (found[item] is None and other_key != keys[item]
+                    and similarity(signatures[item], _signature(other_signature)) >= self.threshold):
+                found[item] = other_key
+        return found
+
+    def add(self, key, kind, signature):
+        self.add_many(kind, [key], [signature])
+
+    def add_many(self, kind, keys, signatures):
+        """Store signatures as `kind`'s representatives under `keys`"""
+        import numpy as np
+
+        signatures = np.asarray(signatures, dtype='<u8').reshape(-1, NUM_PERM)
+        now = datetime.now().isoformat()
+        self._forget(keys)
+        self.conn.executemany(
+            'INSERT INTO signatures (key, kind, signature, added_at) VALUES (?, ?, ?, ?)',
+            [(key, kind, signature.tobytes(), now) for key, signature in zip(keys, signatures)]
+        )
+        # Inserting in (band, bucket) order keeps the bucket B-tree writes sequential
+        bands = np.tile(np.arange(BANDS), len(keys))
+        buckets = band_buckets(signatures).ravel()
+        order = np.lexsort((buckets, bands))
+        self.conn.executemany('INSERT OR IGNORE INTO buckets (band, bucket, key) VALUES (?, ?, ?)', zip(
+            bands[order].tolist(), buckets[order].tolist(), [keys[i] for i in (order // BANDS).tolist()]
+        ))
+
+    def _forget(self, keys):
+        """Delete stored signatures and their buckets; buckets are found from the stored signature"""
+        import numpy as np
+
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            stored = self.conn.execute(
+                f'SELECT key, signature FROM signatures WHERE key IN ({placeholders})', chunk
+            ).fetchall()
+            if not stored:
+                continue
+            buckets = band_buckets(np.array([_signature(blob) for _, blob in stored]))
+            self.conn.executemany('DELETE FROM buckets WHERE band = ? AND bucket = ? AND key = ?', [
+                (band, bucket, key) for (key, _), row in zip(stored, buckets.tolist()) for band, bucket in enumerate(row)
+            ])
+            self.conn.executemany('DELETE FROM signatures WHERE key = ?', [(key,) for key, _ in stored])
+
+    def expire(self, kind, window_days=WINDOW_DAYS):
+        """Forget `kind`'s signatures added more than `window_days` ago; returns how many"""
+        cutoff = (datetime.now() - timedelta(days=window_days)).isoformat()
+        expired = [key for (key,) in self.conn.execute(
+            'SELECT key FROM signatures WHERE kind = ? AND added_at < ?', (kind, cutoff)
+        )]
+        with self.conn:
+            self._forget(expired)
+        return len(expired)
+
+def collapse_near_duplicates(df, kind, key_column, title_column, summary_column=None, mask=None,
+                             window_days=WINDOW_DAYS):
+    """Drop rows that near-duplicate an earlier row or a stored item from any collector
+
+    Only rows selected by the boolean `mask` are checked (default: all rows).
+    Kept rows are added to the index as cluster representatives; `kind`'s
+    representatives older than `window_days` are expired first.
+    """
+    if df.empty:
+        return df
+
+    import numpy as np
+
+    checked = list(mask) if mask is not None else [True] * len(df)
+    titles = df[title_column].tolist()
+    summaries = df[summary_column].tolist() if summary_column else [''] * len(df)
+    keys = [f"{kind}:{value}" for value in df[key_column].tolist()]
+    signatures = [minhash(near_dup_text(title, summary)) if check else None
+                  for title, summary, check in zip(titles, summaries, checked)]
+    rows = [i for i, signature in enumerate(signatures) if signature is not None]
+    if not rows:
+        return df
+    matrix = np.array([signatures[i] for i in rows], dtype=np.uint64)
+    row_keys = [keys[i] for i in rows]
+
+    keep = [True] * len(df)
+    with NearDupIndex() as index:
+        index.expire(kind, window_days)
+        stored = index.representatives(matrix, row_keys)
+        # Earlier rows of this batch count as stored too: (band, bucket) -> rows kept so far
+        batch_buckets = {}
+        kept = []
+        for n, (buckets, stored_match) in enumerate(zip(band_buckets(matrix).tolist(), stored)):
+            buckets = list(enumerate(buckets))
+            candidates = {m for bucket in buckets for m in batch_buckets.get(bucket, ())}
+            if stored_match is not None or any(
+                row_keys[m] != row_keys[n] and similarity(matrix[n], matrix[m]) >= index.threshold
+                for m in candidates
+            ):
+                keep[rows[n]] = False
+                continue
+            for bucket in buckets:
+                batch_buckets.setdefault(bucket, []).append(n)
+            kept.append(n)
+        index.add_many(kind, [row_keys[n] for n in kept], matrix[kept])
+
+    dropped = len(keep) - sum(keep)
+    if dropped:
+        print(f"  🧬 Collapsed {dropped} near-duplicate {kind} items")
+    return df[keep]
@@ -3,10 +3,16 @@
 HTI Partner Organization Monitor
 Tracks your 8 distribution partners for opportunities
 """
-import os
-import pandas as pd
-from datetime import datetime
-import feedparser
+import sys
+from urllib.parse import quote_plus
+from feed_fetcher import commit_feed_state, fetch_feeds
+from near_dup import collapse_near_duplicates
+from keyword_matcher import KeywordMatcher
+from history_store import REPORT_KEYS, HistoryStore
+from report_io import write_report
+from report_schema import apply_schema, sort_report
+from records import PartnerItem, records_frame, run_clock
+from metrics import stage
 
 PARTNERS = [
     {'name': 'YMCA of the Triangle', 'website': 'https://www.ymcatriangle.org', 'focus': 'Youth programs'},
@@ -19,45 +25,50 @@ PARTNERS = [
     {'name': 'Raleigh Dream Center', 'website': 'https://raleighdreamcenter.org', 'focus': 'Community outreach'}
 ]
 
-def search_partner_news(partner):
-    """Search Google News for partner mentions"""
-    results = []
-    search_query = f"{partner['name']} North Carolina"
-    rss_url = f"https://news.google.com/rss/search?q={search_query.replace(' ', '+')}&hl=en-US&gl=US&ceid=US:en"
-    
-    try:
-        feed = feedparser.parse(rss_url)
-        for entry in feed.entries[:5]:
-            results.append({
-                'Partner': partner['name'],
-                'Type': 'News Mention',
-                'Title': entry.title,
-                'Summary': entry.get('summary', '')[:200],
-                'URL': entry.link,
-                'Date': entry.get('published', 'Unknown'),
-                'Opportunity_Type': categorize_opportunity(entry.title, entry.get('summary', '')),
-                'Timestamp': datetime.now().isoformat()
-            })
-    except Exception as e:
-        print(f"Error searching news for {partner['name']}: {e}")
-    
-    return results
+# Checked in order; the first category with a hit wins
+OPPORTUNITY_MATCHER = KeywordMatcher({
+    'Expansion': ['expand', 'new location', 'open', 'launch'],
+    'Funding News': ['grant', 'funding', 'donation', 'million'],
+    'Partnership': ['partnership', 'partner', 'collaborate'],
+    'Event': ['event', 'fundraiser', 'gala'],
+    'Leadership Change': ['hire', 'director', 'ceo', 'leadership']
+})
+
+def partner_feed_url(partner):
+    """Google News RSS search for partner mentions"""
+    search_query = quote_plus(f"{partner['name']} North Carolina")
+    return f"https://news.google.com/rss/search?q={search_query}&hl=en-US&gl=US&ceid=US:en"
+
+def search_partner_news(partner, entries):
+    """Rows for a partner's news entries (only entries not seen in earlier runs); score_partners categorizes them"""
+    return [
+        PartnerItem(
+            Partner=partner['name'],
+            Type='News Mention',
+            Title=entry.title,
+            Summary=entry.get('summary', '')[:200],
+            URL=entry.link,
+            Date=entry.get('published', 'Unknown'),
+            Opportunity_Type=None,
+            Timestamp=run_clock()
+        )
+        for entry in entries
+    ]
 
 def categorize_opportunity(title, summary):
     """Categorize opportunity type"""
-    combined = f"{title} {summary}".lower()
-    
-    if any(term in combined for term in ['expand', 'new location', 'open', 'launch']):
-        return 'Expansion'
-    elif any(term in combined for term in ['grant', 'funding', 'donation', 'million']):
-        return 'Funding News'
-    elif any(term in combined for term in ['partnership', 'partner', 'collaborate']):
-        return 'Partnership'
-    elif any(term in combined for term in ['event', 'fundraiser', 'gala']):
-        return 'Event'
-    elif any(term in combined for term in ['hire', 'director', 'ceo', 'leadership']):
-        return 'Leadership Change'
-    return 'General News'
+    return OPPORTUNITY_MATCHER.first_category(title, summary, default='General News')
+
+def categorize_opportunity_batch(titles, summaries):
+    """Vectorized categorize_opportunity over pandas Series"""
+    return OPPORTUNITY_MATCHER.first_category_batch(titles, summaries, default='General News')
+
+def score_partners(df):
+    """Opportunity_Type of every news mention, in one vectorized pass"""
+    news = df['Type'] == 'News Mention'
+    if news.any():
+        df.loc[news, 'Opportunity_Type'] = categorize_opportunity_batch(df.loc[news, 'Title'], df.loc[news, 'Summary'])
+    return df
 
 def run_collector():
     """Main collector function"""
@@ -65,34 +76,49 @@ def run_collector():
     
     all_results = []
     
-    for partner in PARTNERS:
-        print(f"  Checking {partner['name']}...")
-        news = search_partner_news(partner)
-        all_results.extend(news)
+    # All partner feeds at once; unchanged feeds (304) and already-seen entries come back empty
+    with stage('partners', 'fetch'):
+        feeds, feed_updates = fetch_feeds([partner_feed_url(partner) for partner in PARTNERS], limit=5)
+    
+    with stage('partners', 'build'):
+        for partner in PARTNERS:
+            news = search_partner_news(partner, feeds[partner_feed_url(partner)])
+            print(f"  {partner['name']}: {len(news)} new mentions")
+            all_results.extend(news)
+            
+            all_results.append(PartnerItem(
+                Partner=partner['name'],
+                Type='Partner Profile',
+                Title=f"Focus: {partner['focus']}",
+                Summary=f"Website: {partner['website']}",
+                URL=partner['website'],
+                Date='Ongoing',
+                Opportunity_Type='Reference',
+                Timestamp=run_clock()
+            ))
         
-        all_results.append({
-            'Partner': partner['name'],
-            'Type': 'Partner Profile',
-            'Title': f"Focus: {partner['focus']}",
-            'Summary': f"Website: {partner['website']}",
-            'URL': partner['website'],
-            'Date': 'Ongoing',
-            'Opportunity_Type': 'Reference',
-            'Timestamp': datetime.now().isoformat()
-        })
+        df = records_frame(all_results, PartnerItem)
+        if not df.empty:
+            df = collapse_near_duplicates(df, 'partners', 'URL', 'Title', 'Summary', mask=df['Type'] == 'News Mention')
     
-    df = pd.DataFrame(all_results)
     if not df.empty:
-        type_order = {'Expansion': 0, 'Funding News': 1, 'Partnership': 2, 'Event': 3, 'Leadership Change': 4, 'General News': 5, 'Reference': 6}
-        df['_sort'] = df['Opportunity_Type'].map(type_order)
-        df = df.sort_values('_sort').drop('_sort', axis=1)
+        with stage('partners', 'score'):
+            df = sort_report(apply_schema(score_partners(df), 'partners'), 'partners')
     
-    os.makedirs('reports', exist_ok=True)
-    filename = f"reports/partners-{datetime.now().strftime('%Y-%m-%d')}.csv"
-    df.to_csv(filename, index=False)
+    with stage('partners', 'write'):
+        filename = write_report(df, 'partners')
+    # Only now are this run's entries safe to treat as seen
+    commit_feed_state(feed_updates)
     print(f"\n✅ Saved {len(df)} partner updates to {filename}")
     
+    with stage('partners', 'store'), HistoryStore() as store:
+        history = store.upsert('partners', df, REPORT_KEYS['partners'])
+    print(f"   New since last run: {history['new']} (changed: {history['changed']})")
+    
     return df
 
 if __name__ == '__main__':
+    if '--check' in sys.argv:
+        from config_check import run_check
+        sys.exit(run_check(['partners']))
     run_collector()
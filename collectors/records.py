@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+HTI Report Records
+Row types the collectors build their reports from. Field names are the
+report's column names. Each type is a NamedTuple: slotted, immutable and
+checked for shape at construction, unlike a dict of repeated string keys. A
+list of records becomes a DataFrame in one bulk `records_frame` call.
+
+Rows share one timestamp per run (`run_clock`) instead of reading the clock
+once per row.
+"""
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+_clock = None
+_clock_lock = threading.Lock()
+
+def run_clock():
+    """ISO timestamp of the current run, taken the first time it is asked for"""
+    global _clock
+    with _clock_lock:
+        if _clock is None:
+            _clock = datetime.now().isoformat()
+        return _clock
+
+def reset_run_clock():
+    """Start a new run: the next run_clock() reads the clock again"""
+    global _clock
+    with _clock_lock:
+        _clock = None
+
+class Opportunity(NamedTuple):
+    """One grants report row"""
+    Source: str
+    Title: str
+    Agency: str
+    Amount: object
+    Deadline: object
+    Status: str
+    URL: str
+    Relevance: str
+    Timestamp: str
+    Deep_Scrape: bool = False
+    Content_Preview: Optional[str] = None
+    # Deep scrapes: whether the page mentions deadlines / award amounts
+    Has_Deadline: Optional[bool] = None
+    Has_Amount: Optional[bool] = None
+
+class PartnerItem(NamedTuple):
+    """One partners report row"""
+    Partner: str
+    Type: str
+    Title: str
+    Summary: str
+    URL: str
+    Date: str
+    Opportunity_Type: str
+    Timestamp: str
+
+class CompetitorSnapshot(NamedTuple):
+    """One competitors report row"""
+    Organization: str
+    Type: str
+    URL: str
+    Insights: str
+    Content_Length: int
+    Last_Scraped: str
+    Status: str
+
+class Story(NamedTuple):
+    """One fetched Reddit post, before scoring adds the story columns"""
+    Post_ID: str
+    Subreddit: str
+    Title: str
+    Selftext: str
+    Upvotes: int
+    Comments: int
+    URL: str
+    Timestamp: str
+
+def records_frame(records, record_type):
+    """DataFrame of `record_type` rows, with its columns even when there are none"""
+    import pandas as pd
+    return pd.DataFrame.from_records(list(records), columns=record_type._fields)
@@ -2,12 +2,24 @@
 """
 HTI Reddit Monitor - NC Digital Divide Stories
 Finds real stories of technology need for grant applications and impact reports
+
+    python reddit_digital_divide.py            # daily search over the past week
+    python reddit_digital_divide.py --stream   # long-running incremental monitor
 """
 import os
-import praw
-import pandas as pd
-from datetime import datetime
-from textblob import TextBlob
+import sys
+import json
+import time
+from keyword_matcher import KeywordMatcher
+from state import state_path
+from config_check import env_number
+from sentiment import analyze_sentiment_batch, save_memo
+from near_dup import collapse_near_duplicates
+from history_store import REPORT_KEYS, HistoryStore
+from report_io import append_report, write_report
+from report_schema import apply_schema, sort_report
+from records import Story, records_frame, reset_run_clock, run_clock
+from metrics import stage
 
 # NC-focused subreddits
 SUBREDDITS = [
@@ -32,6 +44,20 @@ KEYWORDS = [
     'remote learning', 'online school', 'virtual learning'
 ]
 
+# Search planning: one multireddit, OR-combined keyword queries, large pages
+MAX_QUERY_LENGTH = 512  # Reddit search query limit
+SEARCH_WINDOW = 'week'
+WINDOW_DAYS = 7  # SEARCH_WINDOW in days: how long a reported story hides its reposts
+TERMS_PER_QUERY = env_number('REDDIT_TERMS_PER_QUERY', 9)
+SEARCH_LIMIT = env_number('REDDIT_SEARCH_LIMIT', 250)
+
+# Streaming mode: micro-batch size, max seconds between writes, checkpoint file
+STREAM_BATCH_SIZE = env_number('REDDIT_STREAM_BATCH_SIZE', 25)
+STREAM_FLUSH_SECONDS = env_number('REDDIT_STREAM_FLUSH_SECONDS', 300)
+STREAM_CHECKPOINT = 'reddit-stream-checkpoint.json'
+# Streamed stories go to their own dated report, so the daily search's report never overwrites them
+STREAM_REPORT = 'digital-divide-stream'
+
 # Story value indicators
 STORY_INDICATORS = [
     'single mom', 'single parent', 'low income', 'struggling',
@@ -39,35 +65,35 @@ STORY_INDICATORS = [
     'student', 'kid', 'children', 'family', 'veteran'
 ]
 
-def analyze_sentiment(text):
-    """Analyze text sentiment"""
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity
-    if polarity > 0.1:
-        return 'Positive'
-    elif polarity < -0.1:
-        return 'Negative'
-    return 'Neutral'
+# Compiled once; each post is scanned in a single pass
+STORY_MATCHER = KeywordMatcher({
+    'story': STORY_INDICATORS,
+    'nc': ['north carolina', 'nc', 'raleigh', 'durham', 'charlotte', 'triangle', 'triad'],
+    'urgency': ['desperate', 'urgent', 'help', 'please', 'need', 'can\'t']
+})
+
+# Server-side search does keyword filtering; the stream has to do it locally
+NEED_MATCHER = KeywordMatcher({'need': KEYWORDS})
+
+# Checked in order; the first category with a hit wins
+USE_CASE_MATCHER = KeywordMatcher({
+    'K-12 Student': ['student', 'school', 'homework', 'class'],
+    'College Student': ['college', 'university', 'degree'],
+    'Job Seeker': ['job', 'resume', 'employment', 'work from home'],
+    'Veteran': ['veteran', 'military', 'va'],
+    'Single Parent': ['single mom', 'single parent', 'parent'],
+    'Special Needs': ['disabled', 'disability', 'special needs']
+})
 
 def calculate_story_value(title, selftext):
     """Calculate how valuable this story is for HTI"""
-    combined = f"{title} {selftext}".lower()
-    score = 0
+    hits = STORY_MATCHER.scan(title, selftext)
+    score = 2 * len(hits.get('story', ()))
     
-    for indicator in STORY_INDICATORS:
-        if indicator in combined:
-            score += 2
+    if 'nc' in hits:
+        score += 3
     
-    nc_terms = ['north carolina', 'nc', 'raleigh', 'durham', 'charlotte', 'triangle', 'triad']
-    for term in nc_terms:
-        if term in combined:
-            score += 3
-            break
-    
-    urgency_terms = ['desperate', 'urgent', 'help', 'please', 'need', 'can\'t']
-    for term in urgency_terms:
-        if term in combined:
-            score += 1
+    score += len(hits.get('urgency', ()))
     
     if score >= 6:
         return 'High'
@@ -77,67 +103,124 @@ def calculate_story_value(title, selftext):
 
 def extract_use_case(title, selftext):
     """Extract potential use case category"""
-    combined = f"{title} {selftext}".lower()
-    
-    if any(term in combined for term in ['student', 'school', 'homework', 'class']):
-        return 'K-12 Student'
-    elif any(term in combined for term in ['college', 'university', 'degree']):
-        return 'College Student'
-    elif any(term in combined for term in ['job', 'resume', 'employment', 'work from home']):
-        return 'Job Seeker'
-    elif any(term in combined for term in ['veteran', 'military', 'va']):
-        return 'Veteran'
-    elif any(term in combined for term in ['single mom', 'single parent', 'parent']):
-        return 'Single Parent'
-    elif any(term in combined for term in ['disabled', 'disability', 'special needs']):
-        return 'Special Needs'
-    return 'General Need'
+    return USE_CASE_MATCHER.first_category(title, selftext, default='General Need')
 
-def run_collector():
-    """Main collector function"""
-    reddit = praw.Reddit(
+def calculate_story_value_batch(titles, selftexts):
+    """Vectorized calculate_story_value over pandas Series (for backfills and large pulls)"""
+    import numpy as np
+    import pandas as pd
+    counts = STORY_MATCHER.category_counts(titles, selftexts)
+    score = 2 * counts['story'] + 3 * (counts['nc'] > 0) + counts['urgency']
+    return pd.Series(np.select([score >= 6, score >= 3], ['High', 'Medium'], 'Low'), index=titles.index)
+
+def extract_use_case_batch(titles, selftexts):
+    """Vectorized extract_use_case over pandas Series"""
+    return USE_CASE_MATCHER.first_category_batch(titles, selftexts, default='General Need')
+
+def plan_queries(keywords, terms_per_query=TERMS_PER_QUERY, max_length=MAX_QUERY_LENGTH):
+    """Pack keywords into as few OR-combined search queries as the limits allow"""
+    queries, terms = [], []
+    for keyword in keywords:
+        term = f'"{keyword}"' if ' ' in keyword or "'" in keyword else keyword
+        candidate = ' OR '.join(terms + [term])
+        if terms and (len(terms) >= terms_per_query or len(candidate) > max_length):
+            queries.append(' OR '.join(terms))
+            terms = []
+        terms.append(term)
+    if terms:
+        queries.append(' OR '.join(terms))
+    return queries
+
+def score_posts(posts):
+    """Score a DataFrame of raw posts (Title, Selftext, ...) and keep Medium/High stories
+
+    Near-duplicates collapse only among the kept stories, High before Medium,
+    so a Low repost never hides a better telling of the same story.
+    """
+    if posts.empty:
+        return posts
+    
+    posts = posts.assign(Selftext=posts['Selftext'].fillna(''))
+    posts['Story_Value'] = calculate_story_value_batch(posts['Title'], posts['Selftext'])
+    posts = posts[posts['Story_Value'].isin(['Medium', 'High'])]
+    # Cross-posts and reposts of the same story collapse to one
+    posts = posts.sort_values('Story_Value', key=lambda value: value != 'High', kind='stable')
+    posts = collapse_near_duplicates(posts, 'digital-divide', 'Post_ID', 'Title', 'Selftext', window_days=WINDOW_DAYS).copy()
+    posts['Use_Case'] = extract_use_case_batch(posts['Title'], posts['Selftext'])
+    posts['Sentiment'] = analyze_sentiment_batch(
+        [f"{t} {b}" for t, b in zip(posts['Title'], posts['Selftext'])],
+        posts['Post_ID']
+    )
+    save_memo()
+    posts['Title'] = posts['Title'].str[:100]
+    posts['Excerpt'] = posts['Selftext'].str[:200].str.replace('\n', ' ')
+    
+    columns = ['Post_ID', 'Subreddit', 'Title', 'Story_Value', 'Use_Case', 'Sentiment',
+               'Upvotes', 'Comments', 'URL', 'Excerpt', 'Timestamp']
+    return apply_schema(posts[columns], 'digital-divide')
+
+def connect_reddit(session=None):
+    """Read-only Reddit client over a metered session of its own (prawcore sets its own headers)"""
+    import praw
+    from http_session import new_session
+    return praw.Reddit(
         client_id=os.getenv('REDDIT_CLIENT_ID'),
         client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-        user_agent='HTIAutomator/1.0'
+        user_agent='HTIAutomator/1.0',
+        requestor_kwargs={'session': session or new_session()}
+    )
+
+def post_row(post):
+    """Raw (unscored) row for one submission"""
+    return Story(
+        Post_ID=post.id,
+        Subreddit=f'r/{post.subreddit.display_name}',
+        Title=post.title,
+        Selftext=post.selftext or '',
+        Upvotes=post.score,
+        Comments=post.num_comments,
+        URL=f'https://reddit.com{post.permalink}',
+        Timestamp=run_clock()
     )
+
+def run_collector():
+    """Main collector function"""
+    reddit = connect_reddit()
     
-    results = []
+    multireddit = reddit.subreddit('+'.join(SUBREDDITS))
+    queries = plan_queries(KEYWORDS)
+    print(f"🔎 Searching {len(SUBREDDITS)} subreddits with {len(queries)} queries ({len(KEYWORDS)} keywords)...")
     
-    for subreddit_name in SUBREDDITS:
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            
-            for keyword in KEYWORDS[:5]:
-                for post in subreddit.search(keyword, limit=10, time_filter='week'):
-                    story_value = calculate_story_value(post.title, post.selftext or '')
-                    
-                    if story_value in ['Medium', 'High']:
-                        results.append({
-                            'Subreddit': f'r/{subreddit_name}',
-                            'Title': post.title[:100],
-                            'Story_Value': story_value,
-                            'Use_Case': extract_use_case(post.title, post.selftext or ''),
-                            'Sentiment': analyze_sentiment(f"{post.title} {post.selftext or ''}"),
-                            'Upvotes': post.score,
-                            'Comments': post.num_comments,
-                            'URL': f'https://reddit.com{post.permalink}',
-                            'Excerpt': (post.selftext or '')[:200].replace('\n', ' '),
-                            'Timestamp': datetime.now().isoformat()
-                        })
-        except Exception as e:
-            print(f"Error processing r/{subreddit_name}: {e}")
-            continue
-    
-    df = pd.DataFrame(results)
+    # Keyed by post id so a post matched by several queries is fetched and scored once
+    posts = {}
+    
+    with stage('digital-divide', 'fetch'):
+        for query in queries:
+            try:
+                for post in multireddit.search(query, limit=SEARCH_LIMIT, time_filter=SEARCH_WINDOW):
+                    if post.id in posts:
+                        continue
+                    posts[post.id] = post_row(post)
+            except Exception as e:
+                print(f"Error searching '{query}': {e}")
+                continue
+    
+    with stage('digital-divide', 'build'):
+        df = records_frame(posts.values(), Story)
+    
+    # Score every fetched post in one vectorized pass
     if not df.empty:
-        df = df.drop_duplicates(subset=['URL'])
-        df = df.sort_values('Story_Value', ascending=False)
+        with stage('digital-divide', 'score'):
+            df = sort_report(score_posts(df), 'digital-divide')
     
-    os.makedirs('reports', exist_ok=True)
-    filename = f"reports/digital-divide-{datetime.now().strftime('%Y-%m-%d')}.csv"
-    df.to_csv(filename, index=False)
+    with stage('digital-divide', 'write'):
+        filename = write_report(df, 'digital-divide')
     print(f"Saved {len(df)} stories to {filename}")
     
+    with stage('digital-divide', 'store'), HistoryStore() as store:
+        history = store.upsert('digital-divide', df, REPORT_KEYS['digital-divide'])
+    print(f"  New since last run: {history['new']}")
+    
     if not df.empty:
         print(f"\n📊 Summary:")
         print(f"  High-value stories: {len(df[df['Story_Value'] == 'High'])}")
@@ -145,5 +228,83 @@ def run_collector():
     
     return df
 
+def load_checkpoint():
+    """Last streamed submission: {'created_utc': float, 'ids': [ids at that second]}"""
+    path = state_path(STREAM_CHECKPOINT)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {'created_utc': 0.0, 'ids': []}
+
+def save_checkpoint(checkpoint):
+    path = state_path(STREAM_CHECKPOINT)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(f'{path}.tmp', path)
+
+def append_stories(df, store, run_id):
+    """Merge a scored micro-batch into today's stream report and upsert it into the history store
+
+    Stream rows are stored under their own kind, so they never move the daily
+    'digital-divide' run's changed rows or its latest run id.
+    """
+    filename = append_report(df, STREAM_REPORT, REPORT_KEYS['digital-divide'])
+    store.upsert(STREAM_REPORT, df, REPORT_KEYS['digital-divide'], run_id=run_id)
+    return filename
+
+def stream_collector():
+    """Long-running mode: score new submissions as they arrive, writing micro-batches"""
+    reddit = connect_reddit()
+    multireddit = reddit.subreddit('+'.join(SUBREDDITS))
+    checkpoint = load_checkpoint()
+    store = HistoryStore()
+    run_id = store.start_run(STREAM_REPORT)
+    pending = {}
+    last_flush = time.monotonic()
+    
+    def flush():
+        nonlocal pending, last_flush
+        if pending:
+            stories = score_posts(records_frame(pending.values(), Story))
+            if not stories.empty:
+                filename = append_stories(stories, store, run_id)
+                print(f"  💾 {len(stories)} new stories -> {filename}")
+        # Checkpoint only after the batch is written so a crash never skips posts
+        save_checkpoint(checkpoint)
+        pending = {}
+        last_flush = time.monotonic()
+        # Each micro-batch is its own run: the next batch's rows get a fresh timestamp
+        reset_run_clock()
+    
+    print(f"📡 Streaming {len(SUBREDDITS)} subreddits (batch {STREAM_BATCH_SIZE}, flush every {STREAM_FLUSH_SECONDS}s)...")
+    
+    try:
+        # pause_after=0 yields None whenever a poll finds nothing new, so idle periods still flush
+        for post in multireddit.stream.submissions(pause_after=0):
+            if post is not None:
+                created = post.created_utc
+                if created < checkpoint['created_utc'] or (created == checkpoint['created_utc'] and post.id in checkpoint['ids']):
+                    continue
+                if created > checkpoint['created_utc']:
+                    checkpoint = {'created_utc': created, 'ids': []}
+                checkpoint['ids'].append(post.id)
+                
+                if NEED_MATCHER.scan(post.title, post.selftext):
+                    pending[post.id] = post_row(post)
+            
+            if len(pending) >= STREAM_BATCH_SIZE or time.monotonic() - last_flush >= STREAM_FLUSH_SECONDS:
+                flush()
+    except KeyboardInterrupt:
+        print("\n⏹️ Stopping stream")
+    finally:
+        flush()
+        store.close()
+
 if __name__ == '__main__':
-    run_collector()
+    if '--check' in sys.argv:
+        from config_check import run_check
+        sys.exit(run_check(['digital-divide']))
+    if '--stream' in sys.argv:
+        stream_collector()
+    else:
+        run_collector()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+HTI Relevance Ranker
+Scores texts against a mission profile by TF-IDF cosine similarity, for a
+whole batch at once.
+
+Features are hashed word unigrams and bigrams (N_FEATURES buckets), so
+there is no vocabulary to grow or store. Document frequencies of every
+hashed feature are kept between runs in the state dir, together with hashes
+of the documents already counted. Each run only adds the documents it hasn't
+seen, so IDF sharpens as the opportunity history grows.
+
+Nothing runs per word or per document in Python: the batch is joined and
+encoded once, tokenized and hashed as one UTF-8 byte array (each word from
+its first and last 8 bytes and its length) and held as CSR-style arrays
+(row / feature / count); document keys are hashed by pandas' hash_array.
+The product with the dense profile vector is one gather plus np.add.reduceat over the rows, so
+tens of thousands of opportunities score well under a second without scipy.
+"""
+import os
+from state import state_path
+
+RANK_STATE = 'relevance-idf.npz'
+# Bumped when stored statistics can't be reused (2: document keys hashed by hash_array, not blake2b)
+STATE_VERSION = 2
+N_FEATURES = 1 << 18  # a power of two: features are the top bits of a multiplicative hash
+FEATURE_MIX = 0x9E3779B97F4A7C15  # odd 64-bit golden-ratio multiplier (Fibonacci hashing)
+
+# Lowercases ASCII and turns every byte that can't be part of a word into 0 in one
+# bytes.translate; words are runs of ASCII letters/digits or non-ASCII (UTF-8) bytes
+WORD_TABLE = bytes(
+    c + 32 if 65 <= c <= 90 else c if chr(c).isalnum() or c >= 0x80 else 0
+    for c in range(256)
+)
+# LOW_BYTES[n] keeps the first n bytes of a little-endian uint64
+LOW_BYTES = [(1 << (8 * n)) - 1 for n in range(9)]
+STOPWORDS = (
+    'a', 'an', 'and', 'the', 'of', 'to', 'in', 'for', 'on', 'at', 'by', 'with', 'from', 'or',
+    'is', 'are', 'was', 'be', 'as', 'its', 'it', 'this', 'that', 'their', 'our', 'we', 'will', 's'
+)
+
+def _key_hashes(keys):
+    """Signed 64-bit hashes of document keys (stored to count each document once)"""
+    import numpy as np
+    import pandas as pd
+    return pd.util.hash_array(pd.Series(keys, dtype=object).astype(str).to_numpy(), categorize=False).view(np.int64)
+
+def _word_hashes(texts):
+    """(rows, hashes) of every word in `texts`, in order; hashes are uint64"""
+    import numpy as np
+    import pandas as pd
+
+    texts = pd.Series(texts, dtype=object)
+    if pd.api.types.infer_dtype(texts, skipna=False) != 'string':
+        texts = texts.fillna('').astype(str)
+    if texts.str.contains('\0', regex=False).any():
+        # The separator must only ever end a text
+        texts = texts.str.replace('\0', ' ', regex=False)
+    texts = texts.tolist()
+    joined = '\0'.join(texts)
+    encoded = joined.encode('utf-8')
+    separators = np.flatnonzero(np.frombuffer(encoded, dtype=np.uint8) == 0)
+
+    # Zero padding on both sides keeps every 8-byte window below inside the buffer
+    raw = bytes(8) + encoded.translate(WORD_TABLE) + bytes(8)
+    data = np.frombuffer(raw, dtype=np.uint8)
+
+    # Word boundaries are where the byte switches between zero and non-zero
+    in_word = data != 0
+    flips = np.flatnonzero(in_word[1:] != in_word[:-1]) + 1
+    starts, ends = flips[0::2], flips[1::2]
+    lengths = (ends - starts).astype(np.uint64)
+
+    # A word's first and last 8 bytes, read as little-endian uint64s through an overlapping
+    # view with a 1-byte stride; with the length they identify every word up to 16 bytes
+    windows = np.ndarray((len(raw) - 7,), dtype='<u8', buffer=raw, strides=(1,))
+    head = windows[starts] & np.array(LOW_BYTES, dtype=np.uint64)[np.minimum(lengths, 8)]
+    tail = np.where(lengths > 8, windows[ends - 8], np.uint64(0))
+    hashes = (head ^ (tail * np.uint64(FEATURE_MIX))) + (lengths << np.uint64(56))
+
+    # Texts were joined with one separator byte, so text i ends before text_ends[i];
+    # locating the few text ends among the word starts gives each text's word count
+    text_ends = 8 + np.append(separators, len(encoded))[:len(texts)]
+    counts = np.diff(np.searchsorted(starts, text_ends), prepend=0)
+    return np.repeat(np.arange(len(texts)), counts), hashes
+
+def hashed_counts(texts, n_features=N_FEATURES):
+    """(rows, features, counts) of unigram + bigram term counts, sorted by row then feature"""
+    import numpy as np
+
+    rows, hashes = _word_hashes(texts)
+    stop_hashes = np.sort(_word_hashes([' '.join(STOPWORDS)])[1])
+    nearest = stop_hashes[np.minimum(np.searchsorted(stop_hashes, hashes), len(stop_hashes) - 1)]
+    kept = nearest != hashes
+    rows, hashes = rows[kept], hashes[kept]
+
+    # Bigrams pair each word with the next kept one in the same text; multiplying the
+    # first word's hash makes (a, b) and (b, a) different features
+    mix = np.uint64(FEATURE_MIX)
+    same_text = rows[:-1] == rows[1:]
+    grams = np.concatenate([hashes, (hashes[:-1][same_text] * mix) ^ hashes[1:][same_text]])
+    rows = np.concatenate([rows, rows[:-1][same_text]])
+
+    # Fibonacci hashing: the top bits of hash * FEATURE_MIX pick the bucket
+    bits = n_features.bit_length() - 1
+    grams *= mix
+    features = (grams >> np.uint64(64 - bits)).astype(np.int64)
+
+    # One sort groups identical (row, feature) pairs; np.unique counts them
+    pairs, counts = np.unique((rows << bits) | features, return_counts=True)
+    return pairs >> bits, pairs & (n_features - 1), counts
+
+class RelevanceRanker:
+    """Cosine similarity of texts to a profile in a persistent hashed TF-IDF space"""
+
+    def __init__(self, profile, path=None, n_features=N_FEATURES):
+        import numpy as np
+
+        self.profile_text = profile
+        self.path = path or state_path(RANK_STATE)
+        self.n_features = n_features
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self.seen = np.zeros(0, dtype=np.int64)
+        if os.path.exists(self.path):
+            with np.load(self.path) as state:
+                version = int(state['version']) if 'version' in state else 1
+                if int(state['n_features']) == n_features and version == STATE_VERSION:
+                    self.doc_freq = state['doc_freq'].astype(np.int64)
+                    self.n_docs = int(state['n_docs'])
+                    self.seen = state['seen']
+
+    def save(self):
+        import numpy as np
+
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, doc_freq=self.doc_freq, n_docs=self.n_docs, seen=self.seen, n_features=self.n_features,
+                     version=STATE_VERSION)
+        os.replace(tmp, self.path)
+
+    def _idf(self):
+        import numpy as np
+        return np.log((1.0 + self.n_docs) / (1.0 + self.doc_freq)) + 1.0
+
+    def update(self, rows, features, keys):
+        """Add documents whose key hasn't been counted before to the document frequencies"""
+        import numpy as np
+
+        hashed = _key_hashes(keys)
+        # Later duplicates of a key in the same batch don't count either
+        _, first = np.unique(hashed, return_index=True)
+        fresh = np.zeros(len(hashed), dtype=bool)
+        fresh[first] = True
+        fresh &= ~np.isin(hashed, self.seen)
+        if not fresh.any():
+            return 0
+
+        self.doc_freq += np.bincount(features[fresh[rows]], minlength=self.n_features)
+        self.n_docs += int(fresh.sum())
+        self.seen = np.union1d(self.seen, hashed[fresh])
+        return int(fresh.sum())
+
+    def profile_vector(self, idf=None):
+        """Unit-length dense TF-IDF vector of the profile"""
+        import numpy as np
+
+        idf = self._idf() if idf is None else idf
+        _, features, counts = hashed_counts([self.profile_text], self.n_features)
+        vector = np.zeros(self.n_features)
+        vector[features] = (1.0 + np.log(counts)) * idf[features]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def score(self, texts, keys=None):
+        """Cosine similarity (0-1) of each text to the profile
+
+        With `keys` (stable ids, e.g. URLs), documents not seen before are
+        added to the IDF statistics first; call save() to keep them.
+        """
+        import numpy as np
+
+        texts = list(texts)
+        rows, features, counts = hashed_counts(texts, self.n_features)
+        if keys is not None:
+            self.update(rows, features, list(keys))
+
+        idf = self._idf()
+        profile = self.profile_vector(idf)
+        weights = (1.0 + np.log(counts)) * idf[features]
+
+        scores = np.zeros(len(texts))
+        if len(rows):
+            # rows is sorted, so each text's entries are contiguous; reduceat sums each run
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            dots = np.add.reduceat(weights * profile[features], starts)
+            norms = np.sqrt(np.add.reduceat(weights * weights, starts))
+            scores[rows[starts]] = dots / norms
+        return scores
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+HTI Report I/O
+Collectors write each report as CSV (for archiving) plus a typed Arrow IPC file,
+and record both in reports/manifest.json. Readers use the manifest to find the
+newest report of each kind, memory-map the Arrow file and pull only the columns
+and leading rows they render.
+"""
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+
+REPORTS_DIR = 'reports'
+MANIFEST = os.path.join(REPORTS_DIR, 'manifest.json')
+
+_manifest_lock = threading.Lock()
+
+def _arrow_safe(df):
+    """Copy of df whose object columns hold a single type (Arrow rejects mixed columns)"""
+    df = df.copy()
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].map(lambda v: v if v is None or isinstance(v, str) or v != v else str(v))
+    return df
+
+def load_manifest():
+    if os.path.exists(MANIFEST):
+        with open(MANIFEST) as f:
+            return json.load(f)
+    return {}
+
+def report_stem(kind, date=None):
+    """reports/<kind>-<date>, the path of a dated report without its extension"""
+    return os.path.join(REPORTS_DIR, f"{kind}-{(date or datetime.now()).strftime('%Y-%m-%d')}")
+
+def write_report(df, kind, date=None):
+    """Write reports/<kind>-<date>.csv (+ .arrow when pyarrow is available) and update the manifest"""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    stem = report_stem(kind, date)
+    filename = f'{stem}.csv'
+    df.to_csv(filename, index=False)
+
+    entry = {
+        'csv': filename,
+        'rows': len(df),
+        'columns': [str(c) for c in df.columns],
+        'written_at': datetime.now().isoformat()
+    }
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+    if pa is not None:
+        table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+        # Uncompressed IPC so readers can memory-map it without copying; replaced, not
+        # rewritten in place, so a reader still mapping the previous file keeps valid pages
+        with pa.OSFile(f'{stem}.arrow.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f'{stem}.arrow.tmp', f'{stem}.arrow')
+        entry['arrow'] = f'{stem}.arrow'
+
+    with _manifest_lock:
+        manifest = load_manifest()
+        manifest[kind] = entry
+        tmp = f'{MANIFEST}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, MANIFEST)
+
+    return filename
+
+def append_report(df, kind, key_column, date=None):
+    """Merge rows into the `date` (default: today) report of `kind` and rewrite it with write_report
+
+    A row whose key is already in the report replaces the stored row.
+    """
+    import pandas as pd
+
+    stem = report_stem(kind, date)
+    existing = None
+    if os.path.exists(f'{stem}.arrow'):
+        try:
+            import pyarrow as pa
+            # Read into memory, not mapped: the file is about to be replaced
+            with pa.OSFile(f'{stem}.arrow', 'rb') as source:
+                existing = pa.ipc.open_file(source).read_all().to_pandas()
+        except ImportError:
+            pass
+    if existing is None and os.path.exists(f'{stem}.csv'):
+        existing = pd.read_csv(f'{stem}.csv')
+    if existing is not None and not existing.empty:
+        df = pd.concat([existing, df], ignore_index=True).drop_duplicates(subset=[key_column], keep='last')
+    return write_report(df, kind, date)
+
+def latest_report_path(kind):
+    """(path, format) of the newest report of `kind`, or (None, None)"""
+    entry = load_manifest().get(kind)
+    if entry:
+        if entry.get('arrow') and os.path.exists(entry['arrow']):
+            try:
+                import pyarrow
+                return entry['arrow'], 'arrow'
+            except ImportError:
+                pass
+        if os.path.exists(entry['csv']):
+            return entry['csv'], 'csv'
+
+    # Reports from before the manifest existed: dated names sort chronologically
+    files = sorted(glob.glob(os.path.join(REPORTS_DIR, f'{kind}-*.csv')))
+    return (files[-1], 'csv') if files else (None, None)
+
+def read_report(kind, columns=None, limit=None, where=None, keys=None):
+    """Newest report of `kind` as a DataFrame, projected to `columns`
+
+    `where` is an optional (column, value) equality filter and `keys` an
+    optional (column, values) membership filter, both applied before `limit`.
+    Returns None when no report exists.
+    """
+    import pandas as pd
+
+    path, fmt = latest_report_path(kind)
+    if path is None:
+        return None
+
+    if fmt == 'arrow':
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+            available = [c for c in (columns or table.column_names) if c in table.column_names]
+            filters = [f[0] for f in (where, keys) if f is not None]
+            if any(c not in table.column_names for c in filters):
+                return pd.DataFrame(columns=available)
+            # Project before filtering, so a filter only copies the wanted columns
+            table = table.select(available + [c for c in dict.fromkeys(filters) if c not in available])
+            if where is not None:
+                table = table.filter(pc.equal(table[where[0]], where[1]))
+            if keys is not None:
+                table = table.filter(pc.is_in(pc.cast(table[keys[0]], pa.string()),
+                                              value_set=pa.array(list(keys[1]), pa.string())))
+            if limit is not None:
+                table = table.slice(0, limit)
+            return table.select(available).to_pandas()
+
+    header = pd.read_csv(path, nrows=0).columns
+    wanted = [c for c in (columns or header) if c in header]
+    filters = [f[0] for f in (where, keys) if f is not None]
+    if any(c not in header for c in filters):
+        return pd.DataFrame(columns=wanted)
+    usecols = wanted + [c for c in dict.fromkeys(filters) if c not in wanted]
+    df = pd.read_csv(path, usecols=usecols, nrows=limit if not filters else None)
+    if where is not None:
+        df = df[df[where[0]] == where[1]]
+    if keys is not None:
+        df = df[df[keys[0]].astype(str).isin(keys[1])]
+    if filters and limit is not None:
+        df = df.head(limit)
+    return df[wanted]
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+HTI Report Schema
+Typed columns shared by the grant, partner, competitor and story reports.
+Deadlines are datetime64, with NO_DEADLINE for rolling or unknown deadlines.
+Amounts are floats (NaN when unknown). Flags are nullable booleans. Low-cardinality labels are
+Categoricals, ordered in report order where the report sorts by them, so
+sorting and "due within N days" filters run vectorized without helper columns.
+
+Collectors type their frame with `apply_schema` before writing. CSV and
+history-store rows come back as plain strings, so readers re-apply it.
+"""
+import re
+
+# Rolling, unknown and 'check website' deadlines: far enough out to sort last and never be due soon
+NO_DEADLINE = '2099-12-31'
+
+AMOUNT_PATTERN = r'(\d+(?:\.\d+)?)\s*(million|thousand|m\b|k\b)?'
+AMOUNT_MULTIPLIERS = {'million': 1e6, 'm': 1e6, 'thousand': 1e3, 'k': 1e3}
+
+# Column -> 'deadline' | 'amount' | 'timestamp' | 'flag' | 'category' | [ordered categories, first sorts first]
+REPORT_SCHEMAS = {
+    'grants': {
+        'Source': 'category',
+        'Relevance': ['High', 'Medium', 'Low'],
+        'Status': 'category',
+        'Deadline': 'deadline',
+        'Amount': 'amount',
+        'Has_Deadline': 'flag',
+        'Has_Amount': 'flag',
+        'Timestamp': 'timestamp'
+    },
+    'partners': {
+        'Partner': 'category',
+        'Type': 'category',
+        'Opportunity_Type': ['Expansion', 'Funding News', 'Partnership', 'Event', 'Leadership Change',
+                             'General News', 'Reference'],
+        'Timestamp': 'timestamp'
+    },
+    'competitors': {
+        'Type': 'category',
+        'Status': ['Scraped', 'Failed', 'Watch List'],
+        'Last_Scraped': 'timestamp'
+    },
+    'digital-divide': {
+        'Subreddit': 'category',
+        'Story_Value': ['High', 'Medium', 'Low'],
+        'Use_Case': 'category',
+        'Sentiment': ['Positive', 'Neutral', 'Negative'],
+        'Timestamp': 'timestamp'
+    }
+}
+
+# Columns each report is sorted by, ascending unless given as (column, False);
+# stable, so rows keep their collected order within a group
+REPORT_SORT = {
+    'grants': [('Relevance_Score', False)],
+    'partners': ['Opportunity_Type'],
+    'digital-divide': ['Story_Value']
+}
+
+def parse_deadlines(values):
+    """datetime64 Series of deadlines; anything that isn't a date becomes NO_DEADLINE"""
+    import pandas as pd
+    no_deadline = pd.Timestamp(NO_DEADLINE)
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.fillna(no_deadline)
+    text = values.astype('string').str.strip()
+    # Grants.gov's MM/DD/YYYY in one vectorized pass; only the rest goes through the slower mixed parser
+    parsed = pd.to_datetime(text, format='%m/%d/%Y', errors='coerce')
+    rest = parsed.isna() & text.notna()
+    if rest.any():
+        # 'March 15' (extracted from foundation pages) means the next March 15
+        today = pd.Timestamp.now().normalize()
+        yearless = ~text[rest].str.contains(r'\b\d{4}\b', regex=True)
+        dated = text[rest].where(~yearless, text[rest] + f' {today.year}')
+        mixed = pd.to_datetime(dated, format='mixed', errors='coerce')
+        mixed = mixed.where(~(yearless & (mixed < today)), mixed + pd.DateOffset(years=1))
+        parsed[rest] = mixed.where((mixed.dt.year >= 1900) & (mixed < no_deadline))
+    return parsed.astype('datetime64[ns]').fillna(no_deadline)
+
+def parse_amounts(values):
+    """float Series of award amounts; a range ('$10,000 - $50,000') gives its upper bound"""
+    import numpy as np
+    import pandas as pd
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    text = values.astype('string').str.replace(',', '', regex=False)
+    matches = text.str.extractall(AMOUNT_PATTERN, flags=re.IGNORECASE)
+    if matches.empty:
+        return pd.Series(np.nan, index=values.index)
+    multiplier = matches[1].str.lower().map(AMOUNT_MULTIPLIERS).fillna(1).astype(float)
+    amounts = matches[0].astype(float) * multiplier
+    return amounts.groupby(level=0).max().reindex(values.index)
+
+def parse_flags(values):
+    """Nullable boolean Series; 'True'/'False' read back from CSV or the history store become booleans"""
+    import pandas as pd
+    values = pd.Series(values)
+    if pd.api.types.is_bool_dtype(values):
+        return values.astype('boolean')
+    text = values.astype('string').str.strip().str.lower()
+    return text.map({'true': True, 'false': False}).astype('boolean')
+
+def _categorical(values, order=None):
+    """Categorical of `values`; with `order`, ordered, and unexpected labels sort after the known ones"""
+    import pandas as pd
+    if order is None:
+        return values.astype('category')
+    present = pd.Series(values).dropna().unique()
+    categories = list(order) + sorted(str(v) for v in present if v not in order)
+    return values.astype(pd.CategoricalDtype(categories, ordered=True))
+
+def apply_schema(df, kind):
+    """Copy of a report frame with its typed columns; columns it lacks are skipped"""
+    schema = REPORT_SCHEMAS.get(kind, {})
+    if df is None or df.empty or not schema:
+        return df
+    import pandas as pd
+    df = df.copy()
+    for column, spec in schema.items():
+        if column not in df.columns:
+            continue
+        if spec == 'deadline':
+            df[column] = parse_deadlines(df[column])
+        elif spec == 'amount':
+            df[column] = parse_amounts(df[column])
+        elif spec == 'timestamp':
+            df[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce')
+        elif spec == 'flag':
+            df[column] = parse_flags(df[column])
+        else:
+            df[column] = _categorical(df[column], None if spec == 'category' else spec)
+    return df
+
+def sort_report(df, kind):
+    """Report rows in their report order (by the ordered categoricals and scores in REPORT_SORT)"""
+    keys = [key if isinstance(key, tuple) else (key, True) for key in REPORT_SORT.get(kind, [])]
+    keys = [(column, ascending) for column, ascending in keys if column in df.columns]
+    if not keys or df.empty:
+        return df
+    columns, ascending = zip(*keys)
+    return df.sort_values(list(columns), ascending=list(ascending), kind='stable')
+
+def due_within(df, days, today=None, column='Deadline'):
+    """Rows whose deadline falls between today and `days` days from now"""
+    import pandas as pd
+    today = pd.Timestamp(today).normalize() if today is not None else pd.Timestamp.now().normalize()
+    deadlines = df[column]
+    return df[(deadlines >= today) & (deadlines < today + pd.Timedelta(days=days + 1))]
+
+def format_deadline(value):
+    """Deadline for display: 'Mar 15, 2025', or 'Rolling/Unknown'"""
+    import pandas as pd
+    value = pd.Timestamp(value) if value is not None and not pd.isna(value) else None
+    if value is None or value >= pd.Timestamp(NO_DEADLINE):
+        return 'Rolling/Unknown'
+    return value.strftime('%b %d, %Y').replace(' 0', ' ')
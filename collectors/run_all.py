@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+HTI Market Intelligence Pipeline
+Runs every collector concurrently in one process (sharing one HTTP pool) and
+hands their DataFrames straight to the email digest. CSV/Arrow reports are
+still written by each collector for archiving, and the run's metrics (see
+metrics.py) to reports/metrics-<date>.json / .prom.
+"""
+import sys
+
+if __name__ == '__main__' and '--check' in sys.argv:
+    # Before the collector imports, so a setting that doesn't parse is reported rather than raised
+    from config_check import run_check
+    sys.exit(run_check())
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from metrics import add, profiled, stage, summary, traced_memory, write_metrics
+from records import reset_run_clock
+import grant_tracker
+import reddit_digital_divide
+import partner_monitor
+import competitive_scraper
+import send_email_digest
+
+# Report kind -> collector module
+COLLECTORS = {
+    'grants': grant_tracker,
+    'digital-divide': reddit_digital_divide,
+    'partners': partner_monitor,
+    'competitors': competitive_scraper
+}
+
+def _run_collector(kind):
+    """One collector under its 'total' stage, recording the rows it produced"""
+    with profiled(kind), stage(kind, 'total'):
+        df = COLLECTORS[kind].run_collector()
+    add('rows', len(df), kind=kind, stage='')
+    return df
+
+def run_collectors(kinds=None, max_workers=None):
+    """Run collectors concurrently; returns {kind: DataFrame} for those that succeeded"""
+    kinds = list(kinds or COLLECTORS)
+    frames = {}
+    
+    with ThreadPoolExecutor(max_workers=max_workers or len(kinds)) as pool:
+        futures = {pool.submit(_run_collector, kind): kind for kind in kinds}
+        for future in as_completed(futures):
+            kind = futures[future]
+            try:
+                frames[kind] = future.result()
+            except Exception as e:
+                print(f"❌ {kind} collector failed: {e}")
+    
+    return frames
+
+def run_pipeline():
+    """Collect everything, then send the digest from the in-memory reports"""
+    print("🚀 HTI Market Intelligence Pipeline")
+    started_at = datetime.now()
+    # Every collector's rows carry this run's timestamp
+    reset_run_clock()
+    with traced_memory():
+        frames = run_collectors()
+        failed = [kind for kind in COLLECTORS if kind not in frames]
+        print(f"\n📦 Collected: {', '.join(f'{kind} ({len(df)})' for kind, df in frames.items())}")
+        if failed:
+            print(f"⚠️ Failed: {', '.join(failed)} - left out of the digest")
+        send_email_digest.send_email(frames=frames, failed=failed)
+    
+    print("\n📈 Run metrics:")
+    for kind, totals in summary().items():
+        print(f"  {kind}: {totals.get('seconds', 0):.1f}s, {totals.get('http_requests', 0)} requests "
+              f"({totals.get('http_bytes', 0) / 1e6:.1f} MB), {totals.get('http_rate_limited', 0)} rate-limited, "
+              f"{totals.get('http_timeouts', 0)} timeouts, {totals.get('firecrawl_credits', 0)} credits, "
+              f"{totals.get('rows', 0)} rows")
+    print(f"  Saved to {write_metrics(started_at)}")
+    return frames
+
+if __name__ == '__main__':
+    run_pipeline()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+HTI Scrape Cache
+Persistent per-URL cache of Firecrawl markdown so unchanged pages cost zero credits.
+Each page is also hashed per markdown section, so callers can tell which
+sections changed since the previous snapshot, and can keep a structured
+extraction next to it that survives later scrapes. Changes that call for a
+new extraction stay pending on the entry until one is stored, so a page whose
+extraction was skipped or failed is retried even when later scrapes are cache
+hits.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from state import state_path
+from config_check import env_number
+
+SCRAPE_CACHE_TTL_DAYS = env_number('SCRAPE_CACHE_TTL_DAYS', 7.0, float)
+
+HEADING = re.compile(r'^#{1,6}\s+(.*?)\s*#*\s*$')
+
+def content_hash(markdown):
+    """Stable hash of page content"""
+    return hashlib.sha256((markdown or '').encode('utf-8')).hexdigest()
+
+def split_sections(markdown):
+    """[(heading, text)] of a markdown page; text before the first heading is section ''
+
+    Repeated headings get a ' (2)', ' (3)' ... suffix so every section has its own name.
+    """
+    sections = [['', []]]
+    for line in (markdown or '').splitlines():
+        match = HEADING.match(line)
+        if match:
+            sections.append([match.group(1), []])
+        else:
+            sections[-1][1].append(line)
+
+    result, counts = [], {}
+    for heading, lines in sections:
+        text = '\n'.join(lines).strip()
+        if not heading and not text:
+            continue
+        counts[heading] = counts.get(heading, 0) + 1
+        name = heading if counts[heading] == 1 else f'{heading} ({counts[heading]})'
+        result.append((name, text))
+    return result
+
+def section_hashes(markdown):
+    """{section heading: hash of its whitespace-normalized text}"""
+    return {name: content_hash(' '.join(text.split())) for name, text in split_sections(markdown)}
+
+class ScrapeCache:
+    """URL -> {markdown, hash, sections, changed_sections, fetched_at, ttl[, extract, extracted_at, pending_extract]}
+    as JSON in the state dir
+
+    `extract_when(markdown, changed_sections)` picks the changed sections that
+    need the extraction re-run; they are kept as pending_extract until
+    set_extract().
+    """
+
+    def __init__(self, name, ttl_days=SCRAPE_CACHE_TTL_DAYS, path=None, extract_when=None):
+        self.path = path or state_path(f'scrape-cache-{name}.json')
+        self.ttl = timedelta(days=ttl_days)
+        self.extract_when = extract_when
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ Ignoring unreadable scrape cache {self.path}: {e}")
+
+    def fetched_at(self, url):
+        entry = self.entries.get(url)
+        return datetime.fromisoformat(entry['fetched_at']) if entry else None
+
+    def is_fresh(self, url, now=None):
+        fetched = self.fetched_at(url)
+        if fetched is None:
+            return False
+        ttl = timedelta(seconds=self.entries[url].get('ttl', self.ttl.total_seconds()))
+        return (now or datetime.now()) - fetched < ttl
+
+    def get(self, url):
+        """Cached entry if still within its TTL, else None"""
+        return self.entries.get(url) if self.is_fresh(url) else None
+
+    def put(self, url, markdown):
+        """Store a fresh scrape; returns True if the content changed since last time"""
+        digest = content_hash(markdown)
+        sections = section_hashes(markdown)
+        with self.lock:
+            previous = self.entries.get(url) or {}
+            before = previous.get('sections', {})
+            # Added, edited and removed sections relative to the previous snapshot
+            changed = sorted(name for name in sections.keys() | before.keys() if sections.get(name) != before.get(name))
+            entry = {
+                'markdown': markdown,
+                'hash': digest,
+                'sections': sections,
+                'changed_sections': changed,
+                'fetched_at': datetime.now().isoformat(),
+                'ttl': self.ttl.total_seconds()
+            }
+            if 'extract' in previous:
+                entry['extract'] = previous['extract']
+                entry['extracted_at'] = previous['extracted_at']
+            pending = set(previous.get('pending_extract', []))
+            if self.extract_when is not None:
+                pending.update(self.extract_when(markdown, changed))
+            if pending:
+                entry['pending_extract'] = sorted(pending)
+            self.entries[url] = entry
+        return previous.get('hash') != digest
+
+    def changed_sections(self, url):
+        """Section headings that changed in the latest put() of `url`"""
+        entry = self.entries.get(url)
+        return entry.get('changed_sections', []) if entry else []
+
+    def extract(self, url):
+        """Structured extraction stored for `url` (kept across re-scrapes), or None"""
+        entry = self.entries.get(url)
+        return entry.get('extract') if entry else None
+
+    def pending_extract(self, url):
+        """Changed sections still waiting for an extraction of `url`"""
+        entry = self.entries.get(url)
+        return entry.get('pending_extract', []) if entry else []
+
+    def set_extract(self, url, extract):
+        with self.lock:
+            if url in self.entries:
+                self.entries[url]['extract'] = extract
+                self.entries[url]['extracted_at'] = datetime.now().isoformat()
+                self.entries[url].pop('pending_extract', None)
+
+    def rotation_order(self, items, url_key='url'):
+        """Order a watchlist so never-fetched and stalest pages get the credit budget first"""
+        return sorted(items, key=lambda item: self.fetched_at(item[url_key]) or datetime.min)
+
+    def save(self):
+        tmp = f'{self.path}.tmp'
+        with self.lock:
+            with open(tmp, 'w') as f:
+                json.dump(self.entries, f)
+        os.replace(tmp, self.path)
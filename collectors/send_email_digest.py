@@ -3,15 +3,63 @@
 HTI Daily Email Digest - Premium market intelligence with HTI branding
 """
 import os
-import glob
-import pandas as pd
+import sys
 from datetime import datetime
+from state import state_path
+from history_store import HISTORY_DB, REPORT_KEYS, HistoryStore
+from report_io import read_report
+from report_schema import apply_schema, format_deadline
+from metrics import stage
 
-def generate_email_html():
-    grant_files = glob.glob('reports/grants-*.csv')
-    reddit_files = glob.glob('reports/digital-divide-*.csv')
-    partner_files = glob.glob('reports/partners-*.csv')
+RESEND_API_URL = os.getenv('RESEND_API_URL', 'https://api.resend.com/emails')
 
+def load_report(kind, columns, limit=None, where=None, frames=None):
+    """Rows new or changed in the latest collector run, projected to `columns`
+
+    `frames` holds DataFrames handed over in memory by the orchestrator;
+    otherwise the newest report file is read (memory-mapped Arrow when
+    available). Either way the history store only supplies which keys are
+    new. Rows come back typed by the report schema. Returns None when
+    nothing has `kind`, or when an in-process run handed over frames without
+    it (its collector failed, so the store's latest rows are a previous run's).
+    """
+    if frames is not None and kind not in frames:
+        return None
+    
+    changed = None
+    if os.path.exists(state_path(HISTORY_DB)):
+        with HistoryStore() as store:
+            changed = store.changed_keys_since_last_run(kind)
+    
+    if frames is None:
+        keys = (REPORT_KEYS[kind], changed) if changed is not None else None
+        return apply_schema(read_report(kind, columns, limit=limit, where=where, keys=keys), kind)
+    
+    df = frames[kind]
+    if changed is not None and not df.empty:
+        df = df[df[REPORT_KEYS[kind]].astype(str).isin(changed)]
+    if df.empty:
+        return df
+    df = apply_schema(df, kind)
+    if where is not None:
+        df = df[df[where[0]] == where[1]]
+    df = df[[c for c in columns if c in df.columns]]
+    return df.head(limit) if limit is not None else df
+
+def generate_email_html(frames=None, failed=()):
+    """Render the digest; `frames` maps report kind -> DataFrame from an in-process run, `failed` lists kinds whose collector failed"""
+    # Reports are sorted by relevance (grants by similarity score), so the top rows are all the digest renders
+    with stage('digest', 'load'):
+        grants = load_report('grants', ['Relevance', 'Relevance_Score', 'Title', 'Source', 'Deadline'], limit=5, frames=frames)
+        story_stats = load_report('digital-divide', ['Story_Value', 'Use_Case'], frames=frames)
+        stories = load_report('digital-divide', ['Story_Value', 'Title', 'Subreddit', 'Use_Case'], limit=3, frames=frames)
+        partner_news = load_report('partners', ['Partner', 'Title'], limit=4, where=('Type', 'News Mention'), frames=frames)
+    
+    with stage('digest', 'render'):
+        return _render_html(grants, story_stats, stories, partner_news, failed)
+
+def _render_html(grants, story_stats, stories, partner_news, failed=()):
+    """Digest HTML from the already-projected report frames"""
     today = datetime.now()
     date_formatted = today.strftime('%B %d, %Y')
 
@@ -58,57 +106,70 @@ def generate_email_html():
         <div class="content">
     '''
 
+    # Failed collectors: their sections are left out rather than showing a previous run's items
+    if failed:
+        html += '''<div class="section"><div class="section-header"><span class="section-icon">⚠️</span><span class="section-title">Collection Issues</span></div>'''
+        for kind in failed:
+            html += f'''<div class="card"><div class="card-meta">The {kind} collector failed this run - its section is left out</div></div>'''
+        html += '</div>'
+
     # Grants Section
-    if grant_files:
-        df = pd.read_csv(grant_files[-1])
-        high = df[df['Relevance'] == 'High']
+    if grants is not None:
+        df = grants
+        top = df.nlargest(5, 'Relevance_Score') if 'Relevance_Score' in df.columns else df.head(5)
         html += '''<div class="section"><div class="section-header"><span class="section-icon">💰</span><span class="section-title">Grant Opportunities</span></div>'''
-        for _, row in (high.head(5) if len(high) > 0 else df.head(5)).iterrows():
+        if df.empty:
+            html += '''<div class="card"><div class="card-meta">No new grant opportunities since the last run</div></div>'''
+        for _, row in top.iterrows():
             is_high = row['Relevance'] == 'High'
-            html += f'''<div class="card {'highlight' if is_high else ''}"><span class="badge {'badge-high' if is_high else 'badge-medium'}">{row['Relevance']}</span><div class="card-title" style="margin-top:10px">{str(row['Title'])[:80]}...</div><div class="card-meta">Source: {row['Source']} • Deadline: {row['Deadline']}</div></div>'''
+            html += f'''<div class="card {'highlight' if is_high else ''}"><span class="badge {'badge-high' if is_high else 'badge-medium'}">{row['Relevance']}</span><div class="card-title" style="margin-top:10px">{str(row['Title'])[:80]}...</div><div class="card-meta">Source: {row['Source']} • Deadline: {format_deadline(row['Deadline'])}</div></div>'''
         html += '</div>'
 
     # Digital Divide Section
-    if reddit_files:
-        df = pd.read_csv(reddit_files[-1])
+    if story_stats is not None:
+        df = story_stats
         if not df.empty:
             high_val = len(df[df['Story_Value'] == 'High'])
             html += f'''<div class="section"><div class="section-header"><span class="section-icon">📱</span><span class="section-title">NC Digital Divide Stories</span></div>
             <div class="stats-grid"><div class="stat-card"><div class="stat-value">{high_val}</div><div class="stat-label">High Value</div></div>
             <div class="stat-card"><div class="stat-value">{len(df)}</div><div class="stat-label">Total</div></div>
             <div class="stat-card"><div class="stat-value">{df['Use_Case'].nunique()}</div><div class="stat-label">Use Cases</div></div></div>'''
-            for _, row in df.head(3).iterrows():
+            for _, row in stories.iterrows():
                 html += f'''<div class="card"><span class="badge {'badge-high' if row['Story_Value']=='High' else 'badge-medium'}">{row['Story_Value']}</span><div class="card-title" style="margin-top:10px">{row['Title']}</div><div class="card-meta">{row['Subreddit']} • {row['Use_Case']}</div></div>'''
             html += '</div>'
 
     # Partner Section
-    if partner_files:
-        df = pd.read_csv(partner_files[-1])
-        news = df[df['Type'] == 'News Mention']
+    if partner_news is not None and len(partner_news) > 0:
+        news = partner_news
         if len(news) > 0:
             html += '''<div class="section"><div class="section-header"><span class="section-icon">🤝</span><span class="section-title">Partner Updates</span></div>'''
-            for _, row in news.head(4).iterrows():
+            for _, row in news.iterrows():
                 html += f'''<div class="card"><div class="card-title">{row['Partner']}</div><div class="card-meta">{str(row['Title'])[:60]}...</div></div>'''
             html += '</div>'
 
     html += '''</div><div class="footer"><div class="footer-brand">HubZone Technology Initiative</div><div class="footer-text">Old Laptops. New Opportunities.<br>501(c)(3) EIN: 83-3153294</div></div></div></body></html>'''
     return html
 
-def send_email():
-    import requests
+def send_email(frames=None, failed=()):
+    from http_session import get_session
     api_key = os.getenv('RESEND_API_KEY')
     to_email = os.getenv('DIGEST_EMAIL', 'wsigmon@hubzonetech.org')
     if not api_key:
         print("RESEND_API_KEY not set")
         return
     
-    response = requests.post('https://api.resend.com/emails',
-        headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
-        json={'from': 'HTI Intelligence <reports@resend.dev>', 'to': [to_email],
-              'subject': f"💻 HTI Market Intelligence — {datetime.now().strftime('%b %d')}",
-              'html': generate_email_html()})
+    html = generate_email_html(frames, failed)
+    with stage('digest', 'send'):
+        response = get_session().post(RESEND_API_URL,
+            headers={'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'},
+            json={'from': 'HTI Intelligence <reports@resend.dev>', 'to': [to_email],
+                  'subject': f"💻 HTI Market Intelligence — {datetime.now().strftime('%b %d')}",
+                  'html': html})
     
     print(f"{'✅' if response.status_code == 200 else '❌'} Email {'sent to ' + to_email if response.status_code == 200 else 'failed: ' + response.text}")
 
 if __name__ == '__main__':
+    if '--check' in sys.argv:
+        from config_check import run_check
+        sys.exit(run_check(['digest']))
     send_email()
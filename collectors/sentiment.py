@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+HTI Sentiment Layer
+Pluggable sentiment backends, loaded lazily on first use and memoized by
+post id + content hash so posts we have already seen are never re-scored.
+
+Backends (HTI_SENTIMENT_BACKEND):
+    textblob  TextBlob pattern analyzer (default, slowest import)
+    lexicon   small built-in word list, no third-party imports
+    batch     the lexicon scorer vectorized over a whole pandas Series
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from state import state_path
+
+SENTIMENT_BACKEND = os.getenv('HTI_SENTIMENT_BACKEND', 'textblob')
+SENTIMENT_CACHE = 'sentiment-cache.json'
+
+POSITIVE_WORDS = [
+    'good', 'great', 'thank', 'thanks', 'grateful', 'happy', 'love', 'helpful', 'amazing',
+    'awesome', 'excited', 'glad', 'hope', 'hopeful', 'free', 'success', 'improve', 'appreciate',
+    'blessed', 'kind', 'wonderful', 'best', 'easy', 'works', 'fixed'
+]
+NEGATIVE_WORDS = [
+    'bad', 'broken', 'struggle', 'struggling', 'desperate', 'cannot', "can't", 'afford',
+    'poor', 'sad', 'angry', 'hate', 'worst', 'terrible', 'fail', 'failing', 'lost', 'stress',
+    'stressed', 'behind', 'unemployed', 'homeless', 'slow', 'dead', 'problem', 'worried'
+]
+
+def _word_pattern(words):
+    return r'\b(?:' + '|'.join(re.escape(w) for w in sorted(words, key=len, reverse=True)) + r')\b'
+
+def polarity_label(polarity):
+    if polarity > 0.1:
+        return 'Positive'
+    elif polarity < -0.1:
+        return 'Negative'
+    return 'Neutral'
+
+class TextBlobBackend:
+    """TextBlob polarity; textblob is imported on first use, one shared analyzer"""
+
+    def __init__(self):
+        from textblob import TextBlob
+        from textblob.sentiments import PatternAnalyzer
+        self.TextBlob = TextBlob
+        self.analyzer = PatternAnalyzer()
+
+    def polarity(self, text):
+        return self.TextBlob(text, analyzer=self.analyzer).sentiment.polarity
+
+    def polarities(self, texts):
+        return [self.polarity(text) for text in texts]
+
+class LexiconBackend:
+    """(positive - negative) / (positive + negative) word hits"""
+
+    def __init__(self):
+        self.positive = re.compile(_word_pattern(POSITIVE_WORDS), re.IGNORECASE)
+        self.negative = re.compile(_word_pattern(NEGATIVE_WORDS), re.IGNORECASE)
+
+    def polarity(self, text):
+        pos = len(self.positive.findall(text))
+        neg = len(self.negative.findall(text))
+        return (pos - neg) / (pos + neg) if pos + neg else 0.0
+
+    def polarities(self, texts):
+        return [self.polarity(text) for text in texts]
+
+class BatchLexiconBackend(LexiconBackend):
+    """Lexicon scorer over a whole column with vectorized str.count"""
+
+    def polarities(self, texts):
+        import numpy as np
+        import pandas as pd
+
+        series = pd.Series(list(texts), dtype=object).fillna('').astype(str)
+        pos = series.str.count(self.positive.pattern, flags=re.IGNORECASE).to_numpy()
+        neg = series.str.count(self.negative.pattern, flags=re.IGNORECASE).to_numpy()
+        total = pos + neg
+        return np.divide(pos - neg, total, out=np.zeros(len(series)), where=total > 0).tolist()
+
+BACKENDS = {
+    'textblob': TextBlobBackend,
+    'lexicon': LexiconBackend,
+    'batch': BatchLexiconBackend
+}
+
+_backends = {}
+_memo = None
+_lock = threading.Lock()
+
+def get_backend(name=None):
+    """Backend instance, created (and its imports loaded) on first use"""
+    name = name or SENTIMENT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend: {name}. Available: {list(BACKENDS)}")
+    with _lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+def _memo_store():
+    global _memo
+    if _memo is None:
+        path = state_path(SENTIMENT_CACHE)
+        _memo = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    _memo = json.load(f)
+            except (OSError, ValueError):
+                _memo = {}
+    return _memo
+
+def _memo_key(backend, post_id, text):
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+    return f"{backend}:{post_id or ''}:{digest}"
+
+def save_memo():
+    if _memo is None:
+        return
+    path = state_path(SENTIMENT_CACHE)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(_memo, f)
+    os.replace(f'{path}.tmp', path)
+
+def analyze_sentiment(text, post_id=None, backend=None):
+    """Sentiment label for one text"""
+    return analyze_sentiment_batch([text], [post_id], backend=backend)[0]
+
+def analyze_sentiment_batch(texts, post_ids=None, backend=None):
+    """Sentiment labels for many texts; only texts missing from the memo reach the backend"""
+    name = backend or SENTIMENT_BACKEND
+    texts = [text or '' for text in texts]
+    post_ids = list(post_ids) if post_ids is not None else [None] * len(texts)
+    memo = _memo_store()
+
+    keys = [_memo_key(name, post_id, text) for post_id, text in zip(post_ids, texts)]
+    misses = [i for i, key in enumerate(keys) if key not in memo]
+    if misses:
+        polarities = get_backend(name).polarities([texts[i] for i in misses])
+        for i, polarity in zip(misses, polarities):
+            memo[keys[i]] = polarity_label(polarity)
+
+    return [memo[key] for key in keys]
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+HTI Collector State
+Location of the small files collectors keep between runs (caches, checkpoints)
+"""
+import os
+
+STATE_DIR = os.getenv('HTI_STATE_DIR', '.hti-state')
+
+def state_path(name):
+    """Path of a state file, creating the state directory on first use"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return os.path.join(STATE_DIR, name)
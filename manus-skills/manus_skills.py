@@ -2,18 +2,34 @@
 HTI Manus Skills - Python utility for triggering Manus tasks
 
 Usage:
-    from manus_skills import run_hti_skill
+    from manus_skills import run_hti_skill, run_hti_skills
     result = run_hti_skill("lead-researcher")
+    results = run_hti_skills(["lead-researcher", "grant-scanner"])
 """
 
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
 import requests
 from pathlib import Path
 from datetime import datetime
 
-MANUS_API_BASE = "https://api.manus.im/v1"
+MANUS_API_BASE = os.environ.get("MANUS_API_BASE", "https://api.manus.im/v1")
 SKILLS_DIR = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get("MANUS_CACHE_DIR", SKILLS_DIR / ".cache"))
+SKILL_GLOB = "hti-*.md"
 
+# Polling: start fast, back off exponentially up to a cap, give up after MAX_WAIT
+MAX_WAIT = 600  # 10 minutes
+POLL_INITIAL = 2
+POLL_MAX = 30
+POLL_BACKOFF = 1.5
+
+# Display metadata for known skills; any other hti-*.md in SKILLS_DIR is discovered
+# by the registry with its name and description taken from the markdown itself
 SKILLS = {
     "lead-researcher": {
         "file": "hti-lead-researcher.md",
@@ -41,58 +57,155 @@ def get_api_key() -> str:
     return key
 
 
-def load_skill_prompt(skill_id: str) -> str:
-    """Load the prompt from a skill markdown file."""
-    if skill_id not in SKILLS:
-        raise ValueError(f"Unknown skill: {skill_id}. Available: {list(SKILLS.keys())}")
-
-    skill_file = SKILLS_DIR / SKILLS[skill_id]["file"]
-    content = skill_file.read_text()
+def parse_skill_markdown(content: str) -> dict:
+    """
+    Parse a skill file in one pass.
 
-    # Extract the main prompt from the markdown (between triple backticks after "Task Prompt")
-    lines = content.split("\n")
-    in_prompt = False
+    Returns the title (first "# " heading), a description (first plain text
+    line) and the prompt: the first bare ``` block after a "Task Prompt"
+    heading, or the full content if there is none.
+    """
+    name = description = None
+    seen_task_prompt = in_prompt = False
     prompt_lines = []
 
-    for line in lines:
-        if "```" in line and in_prompt:
-            break
+    for line in content.split("\n"):
         if in_prompt:
+            if "```" in line:
+                break
             prompt_lines.append(line)
-        if "### Task Prompt" in line:
-            in_prompt = False
-        if line.strip() == "```" and "Task Prompt" in "\n".join(lines[:lines.index(line)]):
+            continue
+        stripped = line.strip()
+        if name is None and stripped.startswith("# "):
+            name = stripped[2:].strip()
+        elif description is None and stripped and not stripped.startswith(("#", "-", "```", "|")):
+            description = stripped
+        if "Task Prompt" in line:
+            seen_task_prompt = True
+        elif stripped == "```" and seen_task_prompt:
             in_prompt = True
 
-    # Fallback: use the full content if parsing fails
-    if not prompt_lines:
-        return content
-
-    return "\n".join(prompt_lines)
+    return {
+        "name": name,
+        "description": description,
+        "prompt": "\n".join(prompt_lines) if prompt_lines else content,
+    }
 
 
-def run_hti_skill(skill_id: str, wait: bool = True) -> dict:
+class SkillRegistry:
+    """
+    Every hti-*.md in a directory, parsed once and cached in memory and in a
+    small on-disk index. Entries are re-parsed only when a file's mtime changes.
     """
-    Run an HTI Manus skill.
 
-    Args:
-        skill_id: One of 'lead-researcher', 'grant-scanner', 'equipment-pricer'
-        wait: If True, wait for task completion and return results
+    def __init__(self, skills_dir: Path = SKILLS_DIR, index_file: Path = None):
+        self.skills_dir = Path(skills_dir)
+        self.index_file = index_file or CACHE_DIR / "skill-index.json"
+        self._entries = None
+        self._lock = threading.Lock()
 
-    Returns:
-        dict with task_id and optionally results
-    """
-    api_key = get_api_key()
-    prompt = load_skill_prompt(skill_id)
-    skill_info = SKILLS[skill_id]
+    def _load_index(self) -> dict:
+        if self.index_file.exists():
+            try:
+                return json.loads(self.index_file.read_text())
+            except ValueError:
+                pass
+        return {}
+
+    def _save_index(self, entries: dict) -> None:
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entries))
+        tmp.replace(self.index_file)
+
+    def refresh(self) -> dict:
+        """Skill id -> entry, re-parsing only files whose mtime changed."""
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load_index()
+            entries, changed = {}, False
+
+            for path in sorted(self.skills_dir.glob(SKILL_GLOB)):
+                skill_id = path.stem[len("hti-"):]
+                mtime = path.stat().st_mtime_ns
+                entry = self._entries.get(skill_id)
+                if entry is None or entry["mtime"] != mtime or entry["file"] != path.name:
+                    entry = {"file": path.name, "mtime": mtime, **parse_skill_markdown(path.read_text())}
+                    changed = True
+                entries[skill_id] = entry
+
+            changed = changed or entries.keys() != self._entries.keys()
+            self._entries = entries
+            if changed:
+                self._save_index(entries)
+            return entries
 
-    # Create the task
-    response = requests.post(
+    def skills(self) -> dict:
+        """Skill id -> {file, name, description}, with SKILLS metadata taking precedence."""
+        result = {}
+        for skill_id, entry in self.refresh().items():
+            info = {"file": entry["file"], "name": entry["name"] or skill_id, "description": entry["description"] or ""}
+            info.update(SKILLS.get(skill_id, {}))
+            result[skill_id] = info
+        return result
+
+    def prompt(self, skill_id: str) -> str:
+        entries = self.refresh()
+        if skill_id not in entries:
+            raise ValueError(f"Unknown skill: {skill_id}. Available: {list(entries)}")
+        return entries[skill_id]["prompt"]
+
+
+registry = SkillRegistry()
+
+
+def load_skill_prompt(skill_id: str) -> str:
+    """Load the prompt from a skill markdown file (cached, invalidated by mtime)."""
+    return registry.prompt(skill_id)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive session for task creation and status polling."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["Authorization"] = f"Bearer {get_api_key()}"
+    return _session
+
+
+def _cache_key(skill_id: str, prompt: str) -> str:
+    """Completed results are reused for the same skill + prompt on the same day."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+    return f"{skill_id}:{digest}:{datetime.now().strftime('%Y-%m-%d')}"
+
+
+def _load_cache() -> dict:
+    cache_file = CACHE_DIR / "results.json"
+    if cache_file.exists():
+        try:
+            return json.loads(cache_file.read_text())
+        except ValueError:
+            return {}
+    return {}
+
+
+def _save_cache(cache: dict) -> None:
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_DIR / "results.json.tmp"
+    tmp.write_text(json.dumps(cache))
+    tmp.replace(CACHE_DIR / "results.json")
+
+
+def _create_task(skill_id: str, prompt: str) -> str:
+    """Submit a skill prompt and return the Manus task id."""
+    skill_info = registry.skills().get(skill_id, {"name": skill_id})
+    response = get_session().post(
         f"{MANUS_API_BASE}/tasks",
-        headers={
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        },
         json={
             "prompt": prompt,
             "name": f"{skill_info['name']} - {datetime.now().strftime('%Y-%m-%d')}",
@@ -100,48 +213,139 @@ def run_hti_skill(skill_id: str, wait: bool = True) -> dict:
     )
     response.raise_for_status()
     task_data = response.json()
-    task_id = task_data.get("task_id") or task_data.get("id")
+    return task_data.get("task_id") or task_data.get("id")
+
 
-    result = {"task_id": task_id, "skill": skill_id}
+def _check_task(result: dict) -> bool:
+    """Poll a task once, updating `result`; returns True once it has finished."""
+    status_response = get_session().get(f"{MANUS_API_BASE}/tasks/{result['task_id']}")
+    status_response.raise_for_status()
+    status_data = status_response.json()
+    status = status_data.get("status", "unknown")
+
+    if status in ["completed", "finished", "done"]:
+        result["status"] = "completed"
+        result["outputs"] = status_data.get("outputs", [])
+        result["result"] = status_data.get("result")
+        return True
+    elif status in ["failed", "error"]:
+        result["status"] = "failed"
+        result["error"] = status_data.get("error")
+        return True
+    return False
+
+
+def _poll_intervals(max_wait: float = MAX_WAIT):
+    """Exponential backoff intervals whose total stays within max_wait."""
+    elapsed, interval = 0.0, POLL_INITIAL
+    while elapsed < max_wait:
+        interval = min(interval, max_wait - elapsed)
+        yield interval
+        elapsed += interval
+        interval = min(interval * POLL_BACKOFF, POLL_MAX)
+
+
+def run_hti_skill(skill_id: str, wait: bool = True, use_cache: bool = True) -> dict:
+    """
+    Run an HTI Manus skill.
+
+    Args:
+        skill_id: One of 'lead-researcher', 'grant-scanner', 'equipment-pricer'
+        wait: If True, wait for task completion and return results
+        use_cache: Return today's completed result for the same prompt if there is one
+
+    Returns:
+        dict with task_id and optionally results
+    """
+    get_api_key()
+    prompt = load_skill_prompt(skill_id)
+    cache = _load_cache() if use_cache else {}
+    key = _cache_key(skill_id, prompt)
+    if key in cache:
+        return {**cache[key], "cached": True}
+
+    result = {"task_id": _create_task(skill_id, prompt), "skill": skill_id}
 
     if wait:
-        # Poll for completion
-        import time
-        max_wait = 600  # 10 minutes
-        poll_interval = 10
-        elapsed = 0
-
-        while elapsed < max_wait:
-            status_response = requests.get(
-                f"{MANUS_API_BASE}/tasks/{task_id}",
-                headers={"Authorization": f"Bearer {api_key}"},
-            )
-            status_data = status_response.json()
-            status = status_data.get("status", "unknown")
-
-            if status in ["completed", "finished", "done"]:
-                result["status"] = "completed"
-                result["outputs"] = status_data.get("outputs", [])
-                result["result"] = status_data.get("result")
-                break
-            elif status in ["failed", "error"]:
-                result["status"] = "failed"
-                result["error"] = status_data.get("error")
+        for interval in _poll_intervals():
+            if _check_task(result):
                 break
-
-            time.sleep(poll_interval)
-            elapsed += poll_interval
+            time.sleep(interval)
         else:
             result["status"] = "timeout"
 
+        if use_cache and result["status"] == "completed":
+            cache = _load_cache()
+            cache[key] = result
+            _save_cache(cache)
+
     return result
 
 
+async def _run_one(key: str, skill_id: str, prompt: str, max_wait: float) -> tuple:
+    """
+    (cache key, result) for one skill, polling with backoff off the event loop.
+
+    A task that can't be created or polled comes back with status 'failed'
+    instead of raising, so the other tasks in the batch still finish.
+    """
+    result = {"task_id": None, "skill": skill_id}
+    try:
+        result["task_id"] = await asyncio.to_thread(_create_task, skill_id, prompt)
+        for interval in _poll_intervals(max_wait):
+            if await asyncio.to_thread(_check_task, result):
+                return key, result
+            await asyncio.sleep(interval)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+        return key, result
+    result["status"] = "timeout"
+    return key, result
+
+
+async def iter_hti_skills(skill_ids: list, use_cache: bool = True, max_wait: float = MAX_WAIT):
+    """
+    Submit several skills at once and yield each result as soon as it finishes.
+
+    Cached results (same skill + prompt, same day) are yielded immediately
+    without creating a task.
+    """
+    get_api_key()
+    cache = _load_cache() if use_cache else {}
+    pending = []
+
+    for skill_id in skill_ids:
+        prompt = load_skill_prompt(skill_id)
+        key = _cache_key(skill_id, prompt)
+        if key in cache:
+            yield {**cache[key], "cached": True}
+        else:
+            pending.append(asyncio.ensure_future(_run_one(key, skill_id, prompt, max_wait)))
+
+    for next_done in asyncio.as_completed(pending):
+        key, result = await next_done
+        if use_cache and result.get("status") == "completed":
+            cache = _load_cache()
+            cache[key] = result
+            _save_cache(cache)
+        yield result
+
+
+def run_hti_skills(skill_ids: list, use_cache: bool = True, max_wait: float = MAX_WAIT) -> list:
+    """Run several skills concurrently; results are in completion order."""
+
+    async def collect():
+        return [result async for result in iter_hti_skills(skill_ids, use_cache, max_wait)]
+
+    return asyncio.run(collect())
+
+
 def list_skills() -> list:
     """List available HTI skills."""
     return [
         {"id": k, **v}
-        for k, v in SKILLS.items()
+        for k, v in registry.skills().items()
     ]
 
 
@@ -152,18 +356,21 @@ if __name__ == "__main__":
         print("Available HTI Manus Skills:")
         for skill in list_skills():
             print(f"  - {skill['id']}: {skill['description']}")
-        print("\nUsage: python manus_skills.py <skill-id>")
+        print("\nUsage: python manus_skills.py <skill-id> [<skill-id> ...] | all")
         sys.exit(0)
 
-    skill_id = sys.argv[1]
-    print(f"Running skill: {skill_id}")
+    skill_ids = list(SKILLS) if sys.argv[1:] == ["all"] else sys.argv[1:]
+    print(f"Running skills: {', '.join(skill_ids)}")
 
     try:
-        result = run_hti_skill(skill_id)
-        print(f"Task ID: {result['task_id']}")
-        print(f"Status: {result.get('status', 'submitted')}")
-        if result.get("outputs"):
-            print(f"Outputs: {len(result['outputs'])} files")
+        for result in run_hti_skills(skill_ids):
+            print(f"\n{result['skill']}{' (cached)' if result.get('cached') else ''}")
+            print(f"  Task ID: {result['task_id']}")
+            print(f"  Status: {result.get('status', 'submitted')}")
+            if result.get("outputs"):
+                print(f"  Outputs: {len(result['outputs'])} files")
+            if result.get("error"):
+                print(f"  Error: {result['error']}")
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)